@@ -13,16 +13,88 @@ import sys
 from logging.handlers import RotatingFileHandler
 from os import path
 
+from tornado.httpserver import HTTPServer
 from tornado.ioloop import IOLoop
 from tornado.log import enable_pretty_logging
-from tornado.web import Application
+from tornado.netutil import bind_sockets, bind_unix_socket
+from tornado.web import Application, GZipContentEncoding
 
 # custom modules
 import rpcconfig
 from nodeclient import Node
-from tornado_jsonrpc import JSONRPCHandler
-
-__version__ = "0.0.41"
+from rpcauth import Auth
+from rpclimit import Limits
+from rpcworkers import Workers
+from tornado_jsonrpc import JSONRPCHandler, JSONRPCWebSocketHandler
+
+__version__ = "0.0.49"
+
+
+def make_app(node, registry, config, auth=None, limits=None):
+    """
+    The tornado application, with gzip of the answers above rpccompressmin bytes if rpccompress is on.
+    Websocket clients connect to /ws or /wallet/<name>/ws.
+    auth and limits default to the ones of the config.
+    """
+    transforms = []
+    if config.rpccompress:
+
+        class JSONGZipContentEncoding(GZipContentEncoding):
+            MIN_LENGTH = config.rpccompressmin
+            GZIP_LEVEL = config.rpccompresslevel
+
+        transforms.append(JSONGZipContentEncoding)
+    if auth is None:
+        auth = Auth(config.rpcuser, config.rpcpassword, config.rpcauth)
+    if limits is None:
+        # The buckets are shared by the workers, if any
+        workers = getattr(node, "workers", None)
+        limits = Limits(
+            config.rpcallowip,
+            config.rpciprate,
+            config.rpcipburst,
+            config.rpcuserrate,
+            config.rpcuserburst,
+            config.rpcipv4prefix,
+            config.rpcipv6prefix,
+            shared=workers.path if workers else None,
+        )
+    handler_settings = dict(interface=node, registry=registry, auth=auth, limits=limits)
+    websocket_settings = dict(handler_settings, hub=node.hub)
+    return Application(
+        [
+            (r"/", JSONRPCHandler, handler_settings),
+            (r"/ws", JSONRPCWebSocketHandler, websocket_settings),
+            (r"/wallet/([A-Za-z0-9_-]*)/ws", JSONRPCWebSocketHandler, websocket_settings),
+            (r"/wallet/([A-Za-z0-9_-]*)", JSONRPCHandler, handler_settings),
+        ],
+        transforms=transforms,
+        websocket_ping_interval=30,
+        websocket_max_message_size=config.rpcmaxbody,
+    )
+
+
+def server_settings(config) -> dict:
+    """
+    HTTPServer settings: keep-alive, timeouts and size limits.
+    """
+    return dict(
+        no_keep_alive=bool(config.rpcnokeepalive),
+        idle_connection_timeout=config.rpcidletimeout,
+        body_timeout=config.rpcclienttimeout,
+        max_body_size=config.rpcmaxbody,
+        max_buffer_size=config.rpcmaxbuffer,
+        decompress_request=True,
+    )
+
+
+def unix_socket(config):
+    """
+    Listening unix socket of the rpcunixsocket config, None if there's none. Its file mode is the access control.
+    """
+    if not config.rpcunixsocket:
+        return None
+    return bind_unix_socket(config.rpcunixsocket, mode=int(config.rpcunixsocketmode, 8))
 
 
 if __name__ == "__main__":
@@ -56,20 +128,44 @@ if __name__ == "__main__":
     rotateHandler2.setFormatter(formatter2)
     access_log.addHandler(rotateHandler2)
 
+    workers = None
+    # Bound before the fork too, so that all the workers serve it
+    unix = unix_socket(rpc_config)
+    if rpc_config.rpcprocesses != 1:
+        # Pre-fork: sockets are bound first, then every worker serves them. No IOLoop before that point.
+        sockets = bind_sockets(rpc_config.rpcport)
+        workers = Workers(rpc_config.rpcprocesses, rpc_config.rpcport)
+        workers.fork()
+        app_log.info("Worker {} started".format(workers.index))
+
     try:
-        node = Node(rpc_config)
+        node = Node(rpc_config, workers)
     except Exception as e:
         # At launch, it's ok to close if the node is not available.
         # TODO: once started, disconnects and reconnects have to be taken care of seemlessly.
         app_log.error("Unable to connect to node :", e)
         sys.exit()
 
+    # Only the @rpc declared methods of the node are callable, looked up in a dict.
+    registry = node.registry
+
     # see http://www.tornadoweb.org/en/stable/httpserver.html#http-server for ssl
     #  see http://www.tornadoweb.org/en/stable/web.html#tornado.web.Application.settings for logging and such
     # see also http://www.tornadoweb.org/en/stable/guide/structure.html#the-application-object
-    app = Application([(r"/", JSONRPCHandler, dict(interface=node))])
+    app = make_app(node, registry, rpc_config)
 
     app_log.info("Starting rpc server on port {}".format(rpc_config.rpcport))
-    app.listen(rpc_config.rpcport)
+    server = HTTPServer(app, **server_settings(rpc_config))
+    if workers is None:
+        server.listen(rpc_config.rpcport)
+    else:
+        server.add_sockets(sockets)
+        if workers.primary:
+            # Private port for the wallet calls of the other workers, no rate limits: they were applied there.
+            internal = make_app(node, registry, rpc_config, auth=workers.auth(), limits=Limits())
+            HTTPServer(internal, **server_settings(rpc_config)).add_sockets(workers.internal_sockets)
+    if unix is not None:
+        app_log.info("Listening on unix socket {}".format(rpc_config.rpcunixsocket))
+        server.add_socket(unix)
 
     IOLoop.current().start()
@@ -0,0 +1,66 @@
+"""
+A bounded LRU cache for decrypted, ready to sign, keys.
+
+Used by the wallet while it is unlocked, so that signing does not pay the passphrase
+derivation and key parsing each time.
+
+@EggPool
+"""
+
+import threading
+from collections import OrderedDict
+
+__version__ = "0.0.1"
+
+
+class KeyCache:
+    """
+    Thread safe LRU of address: Key objects.
+    Has to be wiped whenever the wallet gets locked.
+    """
+
+    __slots__ = ("size", "keys", "lock")
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.keys = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, address):
+        """
+        Returns the cached key for that address, or None.
+        """
+        with self.lock:
+            key = self.keys.get(address, None)
+            if key is not None:
+                self.keys.move_to_end(address)
+            return key
+
+    def set(self, address, key):
+        """
+        Stores a key, evicts the least recently used ones if needed.
+        """
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.keys[address] = key
+            self.keys.move_to_end(address)
+            while len(self.keys) > self.size:
+                # Just drop the reference, the key may still be in use by a signing thread.
+                self.keys.popitem(last=False)
+
+    def wipe(self):
+        """
+        Forgets all keys.
+        """
+        with self.lock:
+            for key in self.keys.values():
+                key.wipe()
+            self.keys.clear()
+
+    def __len__(self):
+        return len(self.keys)
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -10,14 +10,26 @@ Also handles wallet and accounts
 
 # Generic modules
 import os
+import re
 import sys
 import threading
+from decimal import Decimal
 from time import time, sleep
 from distutils.version import LooseVersion
 from logging import getLogger
 
 # Bismuth specific modules
-from rpcconnections import Connection
+from rpcconnections import Connection, node_address
+from rpcexecutor import Executor
+from rpcjobs import Jobs
+from rpcledger import open_ledger
+from rpcledgerindex import LedgerIndex
+from rpcnotify import Hub
+from rpcadmission import bulkheads_from_config
+from rpcregistry import Registry, primary, rpc
+from rpcstream import Stream
+from rpcrescan import Rescan
+from rpcsharedcache import SharedCache, sharedcache
 from rpcwallet import Wallet, __version__ as wallet_version
 from ttlcache import Asyncttlcache
 
@@ -25,18 +37,45 @@ from ttlcache import Asyncttlcache
 Note: connections.py is legacy. Will be replaced by a "command_handler" class. WIP, see protobuf code.
 """
 
-__version__ = "0.0.17"
+__version__ = "0.0.33"
 
 # Interface versioning
-API_VERSION = "0.1g"
+API_VERSION = "0.1s"
 """
 0.1c : add getaddresssince(since, minconf, address)
 0.1d : add native command proxy, gettransaction
 0.1e : add getblock(hash)
 0.1f : add getwalletinfo
 0.1g : add encryptwallet, walletpassphrase, walletlock 
+0.1h : add sendmany
+0.1i : add walletpassphrasechange, getjobinfo
+0.1j : add importmulti
+0.1k : add importaddress, listtransactions, watch-only addresses
+0.1l : rescan for importprivkey, importaddress and importmulti
+0.1m : add multi wallets, /wallet/<name> endpoints, listwallets
+0.1n : add getdashboard
+0.1o : declared rpc methods only, named params, params checked before the call
+0.1p : per method bulkheads, server busy error, getrpcinfo
+0.1q : websocket endpoints, subscribe/unsubscribe to blocks, mempool, addresses and wallet notifications
+0.1r : several worker processes (rpcprocesses config), shared result cache
+0.1s : add getindexinfo, sidecar index of the ledger
 """
 
+# Wallet names, as used in the /wallet/<name> endpoints. "" is the default wallet.
+WALLET_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Max number of transactions kept in a dashboard snapshot
+DASHBOARD_TRANSACTIONS = 50
+
+# Dashboards not asked for since that many seconds are no more refreshed by the watchdog, and dropped
+DASHBOARD_IDLE = 300
+
+# Without the poller, the latest transactions of a dashboard are read from the ledger, that many last blocks
+DASHBOARD_BLOCKS = 720
+
+# How often the sidecar ledger index catches up with the ledger tip, sec
+LEDGER_INDEX_INTERVAL = 1
+
 app_log = getLogger("tornado.application")
 
 
@@ -47,57 +86,178 @@ class Node:
 
     __slots__ = (
         "config",
-        "wallet",
+        "wallets",
+        "executor",
+        "jobs",
         "s",
         "connection",
+        "ledger",
         "stop_event",
         "last_height",
         "watchdog_thread",
         "poll",
+        "dashboards",
+        "dashboard_requests",
+        "registry",
+        "hub",
+        "watcher_thread",
+        "indexer_thread",
+        "watch_height",
+        "watch_mempool",
+        "watch_connection",
+        "watch_ledger",
+        "workers",
+        "cache",
+        "relay",
     )
 
-    def __init__(self, config):
+    def __init__(self, config, workers=None):
+        """
+        workers is the rpcworkers.Workers of a pre-fork server, None for a single process.
+        """
+        self.workers = workers
         try:
             self.config = config
-            self.wallet = Wallet(verbose=config.verbose)
+            # Node level pool. Every wallet has its own wallet pool, and they all share the crypto pool.
+            self.executor = Executor(
+                mode=config.executor, workers=config.executorworkers, verbose=config.verbose
+            )
+            self.wallets = {}
+            self.jobs = {}
+            # Per wallet snapshots served by getdashboard, and when they were last asked for
+            self.dashboards = {}
+            self.dashboard_requests = {}
             self.stop_event = threading.Event()
-            self.last_height = 0
+            if self.is_primary:
+                for name in [""] + list(config.wallets):
+                    self._load_wallet(name)
+                # Resume polling where the least advanced local history stopped
+                self.last_height = min(wallet.history.polled for wallet in self.wallets.values())
+            else:
+                # Wallet calls go to the primary worker, only the names are needed here.
+                self.wallets = dict.fromkeys([""] + list(config.wallets))
         except Exception as e:
             print("conn0", e)
+        # getinfo, blocks and transactions, shared by the workers if any
+        self.cache = SharedCache(workers.path if workers else None)
         try:
             # config may not know of poll, that's ok.
             self.poll = self.config.poll
         except:
             self.poll = False
+        # Dispatch table of the @rpc methods, with the per method bulkheads. Bad limits are fatal.
+        self.registry = Registry(
+            self,
+            bulkheads_from_config(config.rpcbulkhead, config.rpcbulkheadtimeout),
+            forward=None if self.is_primary else workers.forwarder(),
+        )
+        # Websocket subscriptions, fed by the watcher thread of the primary, through the relay for the others
+        self.hub = Hub(config.notifyqueue)
+        self.relay = workers.relay() if workers else None
+        self.watch_height = None
+        self.watch_mempool = None
+        # Node connection and ledger of the watcher, opened once someone subscribes
+        self.watch_connection = None
+        self.watch_ledger = None
         # TODO: raise error if missing critical info like bismuth node/path
-        node_ip, node_port = self.config.bismuthnode.split(":")
         try:
-            self.connection = Connection((node_ip, int(node_port)), verbose=config.verbose)
+            self.connection = Connection(node_address(self.config.bismuthnode), verbose=config.verbose)
         except Exception as e:
             print("conn", e)
+        # Chain queries: straight from the node ledger, read only, if bismuthpath has it. Else the node connection.
+        self.ledger = open_ledger(
+            getattr(config, "bismuthpath", ""), getattr(self, "connection", None), getattr(config, "ledgerindex", "")
+        )
         try:
-            self.watchdog_thread = threading.Thread(target=self._watchdog)
-            self.watchdog_thread.daemon = True
-            self.watchdog_thread.start()
+            if self.is_primary:
+                # Single poller, wallet writer and chain watcher
+                self.watchdog_thread = threading.Thread(target=self._watchdog)
+                self.watchdog_thread.daemon = True
+                self.watchdog_thread.start()
+                self.watcher_thread = threading.Thread(target=self._watcher)
+                if getattr(self.ledger, "index_path", None):
+                    # Single writer of the sidecar index
+                    self.indexer_thread = threading.Thread(target=self._indexer)
+                    self.indexer_thread.daemon = True
+                    self.indexer_thread.start()
+            else:
+                self.watcher_thread = threading.Thread(target=self._relay)
+            self.watcher_thread.daemon = True
+            self.watcher_thread.start()
         except Exception as e:
             print("conn2", e)
 
+    @property
+    def is_primary(self) -> bool:
+        """
+        True if this process owns the wallets: always, but for the secondary workers of a pre-fork server.
+        """
+        return self.workers is None or self.workers.primary
+
+    def _load_wallet(self, name):
+        """
+        Loads a wallet and its jobs. "" is the default wallet in .wallet, others live in walletdir.
+        """
+        if name in self.wallets:
+            return
+        if name == "":
+            path = ".wallet"
+        else:
+            if not WALLET_NAME.match(name):
+                raise ValueError("Invalid wallet name {}".format(name))
+            if not os.path.exists(self.config.walletdir):
+                os.mkdir(self.config.walletdir)
+            path = os.path.join(self.config.walletdir, name)
+        self.wallets[name] = Wallet(
+            path,
+            verbose=self.config.verbose,
+            key_cache_size=self.config.walletkeycache,
+            executor=self.executor.with_own_wallet_pool(),
+            key_type=self.config.walletkeytype,
+        )
+        self.jobs[name] = Jobs()
+
+    def _wallet(self, request):
+        """
+        Wallet the request is routed to, the default one if the request has no wallet name.
+        """
+        return self.wallets[getattr(request, "wallet_name", "")]
+
+    def _jobs(self, request):
+        """
+        Jobs of the wallet the request is routed to.
+        """
+        return self.jobs[getattr(request, "wallet_name", "")]
+
     def _poll(self):
         """
-        Will ask the node for the new blocks/tx since last known state and run through filters
+        Will ask the node for the new blocks/tx since last known state and run through filters:
+        transactions of the addresses tracked by the wallet (own and watch-only) go to the local history.
         :return:
         """
+        if not self.last_height and not self.poll:
+            # Polling for the watch-only addresses only: from the tip, their past is what importaddress rescans
+            self.last_height = self.connection.command("statusjson")["blocks"]
         app_log.info("Polling {}".format(self.last_height))
-        blocks = self.connection.command("api_getblocksince", [self.last_height])
-        self.last_height = blocks[:-1][0]
-        for tx in blocks:
-            # print(tx)
-            """
-            [556649, 1521117120.4, '08acc82ebe8fce711191fd544331ce0ee24ce833a2ad36e3d15f8d94', '08acc82ebe8fce711191fd544331ce0ee24ce833a2ad36e3d15f8d94', 0, 
-            'kYVj7Jb50ZwZPhia76tU0VDLSNVg7ba76OqngwYf03Y/yG5RF2z6SS+Lpz3aKGxjN1DFlT3oiwx/3OUg3sGn6F6yTHH5330NGMI/x3ai/IVdcwXwhiq96yvZdIOPuuYIkwrfCCTQF/7kXOcM1Df1+T1dbZ4434NjCDKwHGq1CikNjur3kUsQg0ps6XM3VSTB1Ro1SUfWGY+jRV7Y1YzCs27jf261j95VJCPbFbL8OgA7JiwGPCMlnnbB9H1lCb2OXF1RKk0uyiGNophC5ADUORBIv0QoBiQmn35dNkKxtw1W5S08vB3j3XsZaY9+TSPIitoiYEyj2F+daHiaexx7vTVtDgfFLLsGO8gqIZ94lY+cnGthVBjvE+IiWw4ye6bIKW4l+IR59FIy4tXFwP+mX0rEvxrALLCqh4giNeIZpZzqMzk6QpatmHScl6U2cNzosYeamUNDLatiUojPtFQInlT3xz5Y3VUG/3WBiNmOKsIiiYkDbTfoQRCVVgitmXikEXmH6GiSUWM4+4R0swMq+5Kk5wOfcHJ96Mjv80N8Ul5E4HRw75JsaW38Gf7eIbVCr0pyD2r5KRrFcZIKWcApdArIUBs2S7t5B/exTuqI6ErFZqoa+qu8AZbarSHaL5qT0Oq7feWWYn9nQxDSPZgsomx7YUq6XoDQo6MvFZnuWM8=', 
-            'LS0tLS1CRUdJTiBQVUJMSUMgS0VZLS0tLS0KTUlJQ0lqQU5CZ2txaGtpRzl3MEJBUUVGQUFPQ0FnOEFNSUlDQ2dLQ0FnRUFsVENvaXdiOVZQbXUrN2hwUDBRWQozVE5FQktaSFBxZ0FzUmcvRXNhUTZzTEVLVktjMFl6UnkzYU0yalQ1bDVNenpsd0h4TFZWT3JzdCs0WGlYM1NBClU1L3hKUUMrZVNsQlI3aFY3cFVYRnRMSWdZU29PaXhUN0Z4MzQ2R1NNeDcxWHhvS2UvRUFxOEsxTGNDcGNFKzkKc3laNmZhaVVzYVNBSkNvQWN6dU5PQ3NkaUdHSm1INFlld1RLVlhEQmxDZGJmUGpGOFB2VDF2UVZuSng5cWRQagpucW1lMlMyaTBXSWp3ZHZyR2U3NlY2dEFVWEFaQURIa3hoY2QwaWM5ZVpEcThOVmlkVGNBTURveDdpdWxESmhtCk5iMVZEenBLOFRYWFN0WmoxUE04ZWY5WTEvWWNHbDVtREx3OWgxeG9mLzRvYitnMC9mV1RpbVlyb053L2M5NGsKR3FhMmJibzkzbXY1U1pQRm1Qc0VPck56bnI4M2o2aGtVTG50VmhITmxwRy9wRHlVT1FZYVZERHYvT1MraDhGdwpDOUVCdW4yYWFBTGl1dUZudE1hL2pKVmw0RjJzT1N4MzNuUjY0cUkzamtwa0lCenVBTlI0MWZMYVBPZFl4NUV3CmdHOHRTODhvQ2tmV29BNnA5NVY2TStFT2s3NCtyRVdhTy9WaEpMNjU5ZTRGa2ZVcklqMHNIRnQyMHdySmJaR0QKUEdxOGZoVmwxd2FsamVZYnBtUEFsdHZoQjdOVzFnNDNJZ3F4VlN1NzBxejF2REhMQkdBVUgrMmZpbHBTZUp0NgpwR2RCYU1vQnZrR24vZ0RIWWh4UWxFNmxYK0ViSndrM3hEOFdBUUk5MktWRTJyaksrcmk1ZXFEKzlhU1hwdXF1CmV5enJiTm9xYmN5a21KY00wYzFZdTRNQ0F3RUFBUT09Ci0tLS0tRU5EIFBVQkxJQyBLRVktLS0tLQ==', 
-            'c0039d82b44abb22bda72f07c69119a780ae30b6bdca731fac76f1cd', 0, 14.443351, 0, '62ce921d000000007c6ffbed00000000']
-            """
+        blocks = self.ledger.command("api_getblocksince", [self.last_height])
+        if not blocks:
+            return
+        # rows are [block_height, timestamp, address, recipient, amount, signature, pubkey, block_hash,
+        # fee, reward, operation, openfield]
+        height = max(tx[0] for tx in blocks)
+        for wallet in self.wallets.values():
+            tracked = [
+                tx for tx in blocks
+                if wallet.is_tracked(tx[3]) or wallet.is_tracked(tx[2])
+            ]
+            wallet.history.add(tracked, height)
+        self.last_height = height
+
+    def _polling(self) -> bool:
+        """
+        The poller runs with poll=1, and whenever a wallet has watch-only addresses: they are only tracked that way.
+        """
+        return bool(self.poll) or any(wallet is not None and wallet.watch_only for wallet in self.wallets.values())
 
     def _ping_if_needed(self):
         """
@@ -116,21 +276,262 @@ class Node:
         # Give it some time to start and do things
         sleep(10)
         while not self.stop_event.is_set():
-            if self.poll:
-                self._poll()
-            self._ping_if_needed()
+            # Makes sure decrypted keys do not outlive the unlock timeout. First, whatever the node does.
+            for name, wallet in self.wallets.items():
+                try:
+                    wallet.unlocked_until()
+                except Exception as e:
+                    app_log.error("Watchdog: unlock timeout of wallet '{}': {}".format(name, e))
+            # Each step on its own, one failing does not stop the others nor the thread.
+            if self._polling():
+                try:
+                    self._poll()
+                except Exception as e:
+                    app_log.error("Watchdog: poll: {}".format(e))
+            try:
+                self._ping_if_needed()
+            except Exception as e:
+                app_log.error("Watchdog: ping: {}".format(e))
+            try:
+                self._refresh_dashboards()
+            except Exception as e:
+                app_log.error("Watchdog: dashboards: {}".format(e))
             # 10 sec is a good compromise.
             sleep(10)
 
+    def _watcher(self):
+        """
+        Called in a thread: the single watcher of the websocket subscriptions.
+        Idle - no node command - while nobody is subscribed.
+        """
+        while not self.stop_event.is_set():
+            try:
+                self._watch()
+            except Exception as e:
+                app_log.warning("Watcher: {}".format(e))
+            sleep(self.config.notifyinterval)
+        if self.watch_connection is not None:
+            self.watch_connection.close()
+
+    def _watch_node(self):
+        """
+        Node connection and ledger of the watcher thread, its own: the watcher never waits behind
+        the rpc calls on the shared connection, nor the other way round.
+        """
+        if self.watch_connection is None:
+            connection = Connection(node_address(self.config.bismuthnode), verbose=self.config.verbose)
+            self.watch_ledger = open_ledger(
+                getattr(self.config, "bismuthpath", ""), connection, getattr(self.config, "ledgerindex", "")
+            )
+            self.watch_connection = connection
+        return self.watch_connection, self.watch_ledger
+
+    def _indexer(self):
+        """
+        Called in a thread of the primary: keeps the sidecar ledger index up to the ledger tip.
+        """
+        try:
+            index = LedgerIndex(self.ledger.index_path, self.ledger.path)
+        except Exception as e:
+            app_log.error("Ledger index unavailable: {}".format(e))
+            return
+        while not self.stop_event.is_set():
+            try:
+                done = index.update()
+                if done and self.config.verbose:
+                    app_log.info("Ledger index: {} rows added".format(done))
+            except Exception as e:
+                app_log.warning("Ledger index: {}".format(e))
+            sleep(LEDGER_INDEX_INTERVAL)
+        index.close()
+
+    def _watch(self):
+        """
+        Publishes to the hub the blocks and mempool transactions that appeared since the previous run,
+        and the transactions of the watched addresses and wallets.
+        """
+        blocks, mempool, addresses, wallets = self.hub.wanted()
+        if self.relay is not None:
+            # Plus what the clients of the other workers subscribed to
+            blocks, mempool, addresses, wallets = self.relay.interests(
+                (blocks, mempool, addresses, wallets), 3 * self.config.notifyinterval + 5
+            )
+        if not (blocks or mempool or addresses or wallets):
+            # Starts from the tip again, once someone subscribes
+            self.watch_height = None
+            self.watch_mempool = None
+            return
+        tracked = {
+            name: self.wallets[name].get_tracked_addresses("*", include_watchonly=True)
+            for name in wallets
+            if name in self.wallets
+        }
+        watched = addresses.union(*tracked.values())
+        connection, ledger = self._watch_node()
+        new_blocks, new_transactions, activity = [], [], []
+        if blocks or watched:
+            if self.watch_height is None:
+                self.watch_height = connection.command("statusjson")["blocks"]
+            # rows are [block_height, timestamp, address, recipient, amount, signature, pubkey, block_hash,
+            # fee, reward, operation, openfield]
+            rows = ledger.command("api_getblocksince", [self.watch_height])
+            if rows:
+                by_height = {}
+                for row in rows:
+                    by_height.setdefault(row[0], []).append(row)
+                for height in sorted(by_height):
+                    block_rows = by_height[height]
+                    new_blocks.append(
+                        {
+                            "height": height,
+                            "hash": block_rows[0][7],
+                            "time": max(row[1] for row in block_rows),
+                            "transactions": len(block_rows),
+                        }
+                    )
+                activity.extend(
+                    self._watch_entry(row[1], row[2], row[3], row[4], row[5], row[10], row[11], row[0], row[7])
+                    for row in rows
+                    if row[2] in watched or row[3] in watched
+                )
+                self.watch_height = max(by_height)
+        if mempool or watched:
+            # rows are [timestamp, address, recipient, amount, signature, pubkey, operation, openfield]
+            rows = connection.command("mempool", [[]])
+            if not isinstance(rows, list):
+                rows = []
+            if self.watch_mempool is not None:
+                fresh = [row for row in rows if row[4] not in self.watch_mempool]
+                new_transactions = [
+                    self._watch_entry(row[0], row[1], row[2], row[3], row[4], row[6], row[7]) for row in fresh
+                ]
+                activity.extend(
+                    entry for entry in new_transactions if entry["address"] in watched or entry["recipient"] in watched
+                )
+            self.watch_mempool = {row[4] for row in rows}
+        self.hub.publish(new_blocks if blocks else [], new_transactions if mempool else [], activity, tracked)
+        if self.relay is not None:
+            self.relay.post_event(new_blocks if blocks else [], new_transactions if mempool else [], activity, tracked)
+
+    def _relay(self):
+        """
+        Called in a thread of the secondary workers: tells the primary what the local websocket clients
+        subscribed to, and hands its watcher events to the local hub.
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.relay.post_interest(self.hub.wanted())
+                for blocks, mempool, activity, tracked in self.relay.events():
+                    self.hub.publish(blocks, mempool, activity, tracked)
+            except Exception as e:
+                app_log.warning("Relay: {}".format(e))
+            sleep(self.config.notifyinterval)
+
+    @staticmethod
+    def _watch_entry(timestamp, address, recipient, amount, signature, operation, openfield, height=None, block_hash=None):
+        """
+        Transaction of a notification. height and block_hash are None while in the mempool.
+        """
+        return {
+            "txid": signature[:56],
+            "time": timestamp,
+            "address": address,
+            "recipient": recipient,
+            "amount": float(amount),
+            "operation": operation,
+            "comment": openfield,
+            "blockheight": height,
+            "blockhash": block_hash,
+        }
+
+    def _refresh_dashboards(self):
+        """
+        Rebuilds the dashboard snapshots that were asked for recently, drops the idle ones. Runs in the watchdog thread.
+        """
+        since = time() - DASHBOARD_IDLE
+        names = []
+        for name, when in list(self.dashboard_requests.items()):
+            if when > since:
+                names.append(name)
+                continue
+            self.dashboard_requests.pop(name, None)
+            self.dashboards.pop(name, None)
+        if not names:
+            return
+        try:
+            status = self.connection.command("statusjson")
+        except Exception as e:
+            app_log.warning("Dashboard refresh failed: {}".format(e))
+            return
+        for name in names:
+            try:
+                self._refresh_dashboard(name, status)
+            except Exception as e:
+                # Keep serving the previous snapshot
+                app_log.warning("Dashboard refresh of wallet '{}' failed: {}".format(name, e))
+
+    def _refresh_dashboard(self, name, status=None):
+        """
+        Builds the dashboard snapshot of a wallet: tip, balance and default address per account,
+        latest transactions from the local history - from the ledger when the poller does not feed it.
+        Blocking, never to be called from the loop.
+        """
+        wallet = self.wallets[name]
+        if status is None:
+            status = self.connection.command("statusjson")
+        accounts = {}
+        total = Decimal(0)
+        for account in wallet.list_accounts():
+            addresses = wallet.get_addresses_by_account(account)
+            balance = self.ledger.command("api_getbalance", [addresses, 1])
+            total += Decimal(str(balance))
+            accounts[account] = {"address": addresses[0] if addresses else "", "balance": balance}
+        addresses = wallet.get_tracked_addresses("*")
+        if self._polling():
+            rows = wallet.history.transactions(addresses, DASHBOARD_TRANSACTIONS)
+            tip = None
+        else:
+            tip = status.get("blocks")
+            rows = self._ledger_rows(addresses, tip - DASHBOARD_BLOCKS, DASHBOARD_TRANSACTIONS)
+        snapshot = {
+            "blocks": status.get("blocks"),
+            "info": status,
+            "balance": float(round(total, 8)),
+            "accounts": accounts,
+            "transactions": self._history_entries(wallet, rows, addresses, tip),
+            "updated": int(time()),
+        }
+        self.dashboards[name] = snapshot
+        return snapshot
+
+    def _ledger_rows(self, addresses, since, count):
+        """
+        Most recent rows of the addresses after block since, read from the ledger, in the local history format.
+        """
+        rows = {}
+        for address in addresses:
+            info = self.ledger.command("api_getaddresssince", [since, 1, address])
+            for row in info.get("transactions", []):
+                # No public key column in the history
+                rows[row[5]] = tuple(row[:6]) + tuple(row[7:12])
+        res = sorted(rows.values(), key=lambda row: (row[0], row[1]), reverse=True)
+        return res[:count]
+
     """
     All json-rpc calls are directly mapped to async methods here thereafter:
     As the mapping is auto, we can't conform to PEP and thus, no underscore in method names.
     """
 
+    @rpc()
+    @primary
     def stop(self, *args, **kwargs):
         """Clean stop the server"""
         app_log.info("Stopping Server")
         self.connection.close()
+        for wallet in self.wallets.values():
+            wallet.executor.stop()
+            wallet.close()
+        self.executor.stop()
         # TODO: Close possible open files and db connection
         #
         # TODO: Signal possible threads to terminate and wait.
@@ -143,7 +544,8 @@ class Node:
         # https://gist.github.com/wonderbeyond/d38cd85243befe863cdde54b84505784
         # sys.exit()
 
-    @Asyncttlcache(ttl=10)
+    @rpc()
+    @sharedcache(ttl=10)
     async def getinfo(self, *args, **kwargs):
         """
         Returns a dict with the node info
@@ -174,6 +576,8 @@ class Node:
             info = {"version": self.config.version, "error": str(e)}
         return info
 
+    @rpc(ignore_balance=False)
+    @primary
     async def getwalletinfo(self, *args, **kwargs) -> dict:
         """
         https://bitcoin.org/en/developer-reference#getwalletinfo
@@ -181,17 +585,16 @@ class Node:
         Since balance checks take time, allow to spare significant ressurces by not asking them unless nedded.
         """
         try:
-            ignore_balance = False
-            if len(args) > 1:
-                ignore_balance = args[1]  #  0 is self
+            current = self._wallet(args[0])
+            ignore_balance = args[1]  #  0 is self
             wallet = {
-                "walletname": "bismuthd wallet",  # (string) the wallet name
+                "walletname": getattr(args[0], "wallet_name", ""),  # (string) the wallet name, "" for the default one
                 "walletversion": wallet_version,  # (numeric) the version of the RPC wallet lib
                 "version": self.config.version,  # (numeric) the version of the running RPC server
-                "encrypted": self.wallet.encrypted,  # (boolean) Is the wallet encrypted? - BIS specific
+                "encrypted": current.encrypted,  # (boolean) Is the wallet encrypted? - BIS specific
                 "keypoololdest": 0,  # (numeric) timestamp of oldest pre-generated key in the key pool - N/A, 0 for BIS
                 "keypoolsize": 0,  # (numeric) how many new keys are pre-generated - N/A, 0 for BIS
-                "unlocked_until": self.wallet.unlocked_until(),  # (numeric) the timestamp that the wallet is unlocked for transfers,
+                "unlocked_until": current.unlocked_until(),  # (numeric) the timestamp that the wallet is unlocked for transfers,
                 # or 0 if the wallet is locked
                 "paytxfee": 0.01,  # (numeric) the transaction fee configuration, fixed 0.01 for BIS,
                 # not accounting variable part for data.
@@ -199,7 +602,7 @@ class Node:
                 # (enforced watch-only wallet)
             }
             if not ignore_balance:
-                balance = await self.getbalance()
+                balance = await self.getbalance(args[0], "", 1)
                 if (
                     type(balance) is dict
                     and "error" in balance
@@ -233,48 +636,96 @@ class Node:
             wallet = {"version": self.config.version, "error": str(e)}
         return wallet
 
+    @rpc()
+    @primary
+    async def listwallets(self, *args, **kwargs):
+        """
+        https://bitcoin.org/en/developer-reference#listwallets
+        Names of the loaded wallets, "" is the default one. Others are reached at /wallet/<name>
+        """
+        try:
+            return list(self.wallets.keys())
+        except Exception as e:
+            return {"version": self.config.version, "error": str(e)}
+
+    @rpc()
+    @primary
     async def walletlock(self, *args, **kwargs):
         """
         Forgets the passphrase, locks the wallet
         """
         try:
-            self.wallet.lock()
+            wallet = self._wallet(args[0])
+            wallet.lock()
             return None
         except Exception as e:
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc("passphrase", "timeout")
+    @primary
     async def walletpassphrase(self, *args, **kwargs):
         """
         Stores the passphrase for timeout seconds
         """
         try:
+            wallet = self._wallet(args[0])
             passphrase, timeout = args[1], args[2]
-            return self.wallet.set_passphrase(passphrase, timeout)
+            return wallet.set_passphrase(passphrase, timeout)
         except Exception as e:
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc("passphrase")
+    @primary
     async def encryptwallet(self, *args, **kwargs):
         """
         Encrypt wallet with given passphrase
         """
+        job = None
         try:
+            wallet = self._wallet(args[0])
+            jobs = self._jobs(args[0])
             passphrase = args[1]
-            return self.wallet.encrypt(passphrase)
+            job = jobs.new("encryptwallet")
+            return await wallet.executor.run(wallet.encrypt, passphrase, job)
         except Exception as e:
+            if job:
+                job.cancel(e)
             return {"version": self.config.version, "error": str(e)}
 
-    # @Asyncttlcache(ttl=10)
+    @rpc("oldpassphrase", "newpassphrase")
+    @primary
+    async def walletpassphrasechange(self, *args, **kwargs):
+        """
+        (oldpassphrase) (newpassphrase)  -  Changes the wallet passphrase, then locks the wallet
+        """
+        job = None
+        try:
+            wallet = self._wallet(args[0])
+            jobs = self._jobs(args[0])
+            old_passphrase, new_passphrase = args[1:3]
+            job = jobs.new("walletpassphrasechange")
+            return await wallet.executor.run(
+                wallet.change_passphrase, old_passphrase, new_passphrase, job
+            )
+        except Exception as e:
+            if job:
+                job.cancel(e)
+            return {"version": self.config.version, "error": str(e)}
+
+    @rpc("height")
+    @sharedcache(ttl=10)
     async def getblockhash(self, *args, **kwargs):
         """
         Returns the hash of a given block_height
         """
         try:
-            block = self.connection.command("blockget", [str(args[1])])
+            block = self.ledger.command("blockget", [str(args[1])])
             block = block[0][7]
         except Exception as e:
             block = {"version": self.config.version, "error": str(e)}
         return block
 
+    @rpc("command", "*params")
     async def native(self, *args, **kwargs):
         try:
             result = self.connection.command(str(args[1]), list(args[2:]))
@@ -282,6 +733,7 @@ class Node:
             result = {"version": self.config.version, "error": str(e)}
         return result
 
+    @rpc()
     @Asyncttlcache(ttl=10)
     async def getrawmempool(self, *args, **kwargs):
         """
@@ -289,10 +741,14 @@ class Node:
         """
         try:
             mempool = self.connection.command("mempool", [[]])
+            if isinstance(mempool, list):
+                # Over the cached list, so the cached answer can be sent many times.
+                mempool = Stream(mempool)
         except Exception as e:
             mempool = {"version": self.config.version, "error": str(e)}
         return mempool
 
+    @rpc()
     @Asyncttlcache(ttl=10)
     async def getdifficulty(self, *args, **kwargs):
         """
@@ -305,6 +761,7 @@ class Node:
             diff = {"version": self.config.version, "error": str(e)}
         return diff
 
+    @rpc()
     async def getblocknumber(self, *args, **kwargs):
         """
         Deprecated. Removed in version 0.7. Use getblockcount.
@@ -314,6 +771,7 @@ class Node:
         return info
 
     # No need to cache since it's using cached getinfo()
+    @rpc()
     async def getblockcount(self, *args, **kwargs):
         """
         Returns the number of blocks in the longest block chain.
@@ -326,96 +784,226 @@ class Node:
             error = {"version": self.config.version, "error": str(e)}
             return error
 
+    @rpc("account")
+    @primary
     async def getaccountaddress(self, *args, **kwargs):
         """(account)
         Returns the current bitcoin address for receiving payments to this account.
         If (account) does not exist, it will be created along with an associated new address that will be returned.
         """
         try:
+            wallet = self._wallet(args[0])
             account = args[1]  #  0 is self
-            address = self.wallet.get_account_address(account)
+            address = await wallet.executor.run(wallet.get_account_address, account)
             # address is a single string.
             return address
         except Exception as e:
             error = {"version": self.config.version, "error": str(e)}
         return error
 
+    @rpc("address")
+    @primary
     async def getaccount(self, *args, **kwargs):
         """(address)
         returns the name of the account associated with the given address.
         """
         try:
+            wallet = self._wallet(args[0])
             address = args[1]  #  0 is self
-            return self.wallet.get_account(address)
+            return wallet.get_account(address)
         except Exception as e:
             error = {"version": self.config.version, "error": str(e)}
         return error
 
+    @rpc("address", with_type=False)
+    @primary
     async def dumpprivkey(self, *args, **kwargs):
-        """(address)
+        """(address) (with_type)
         returns the private key corresponding to an address. (But does not remove it from the wallet.)
+        Bismuthd: with_type true returns {"privkey", "key_type"}, key_type being what importprivkey needs.
         """
         try:
+            wallet = self._wallet(args[0])
             address = args[1]  #  0 is self
-            return self.wallet.dump_privkey(address)
+            return await wallet.executor.run(wallet.dump_privkey, address, args[2])
         except Exception as e:
             error = {"version": self.config.version, "error": str(e)}
         return error
 
+    def _rescan_since(self, rescan):
+        """
+        Block height to rescan from: rescan param is true for the whole chain, or a block height. None if no rescan.
+        """
+        if rescan is True:
+            return 0
+        if rescan is False or rescan is None:
+            return None
+        return max(int(rescan), 0)
+
+    def _start_rescan(self, wallet, addresses, since, job):
+        """
+        Rescans the history of the addresses in the background, into the wallet local history.
+        """
+        rescan = Rescan(
+            node_address(self.config.bismuthnode),
+            wallet.history,
+            job,
+            workers=self.config.rescanworkers,
+            stop_event=self.stop_event,
+            verbose=self.config.verbose,
+        )
+        rescan.start(addresses, since)
+
+    @rpc("privkey", account="", rescan=False, key_type=None)
+    @primary
     async def importprivkey(self, *args, **kwargs):
-        """(privkey, account, rescan)
+        """(privkey, account, rescan) (key_type)
         Imports the given privkey in the given account and save updated wallet
+        Bismuthd: key_type (ECDSA or ED25519) is required for hex privkeys, PEM ones are RSA.
+        rescan is true (whole chain) or the block height to start from. It runs in the background,
+        progress with getjobinfo("rescan"). Transactions found go to the local history.
         returns Null on success
         """
+        job = None
         try:
-            privkey = args[1]  #  0 is self
-            account_name = ""
-            if len(args) > 2:
-                account_name = args[2]
-            rescan = False
-            if len(args) > 3:
-                rescan = args[3]
-            return self.wallet.import_privkey(privkey, account_name, rescan)
+            wallet = self._wallet(args[0])
+            jobs = self._jobs(args[0])
+            privkey, account_name, rescan, key_type = args[1:5]  #  0 is self
+            since = self._rescan_since(rescan)
+            # Fails early if a rescan is already pending or running
+            job = jobs.new("rescan") if since is not None else None
+            address = await wallet.executor.run(
+                wallet.import_privkey, privkey, account_name, rescan, key_type
+            )
+            if job:
+                self._start_rescan(wallet, [address], since, job)
+            return None
         except Exception as e:
+            if job:
+                job.cancel(e)
             error = {"version": self.config.version, "error": str(e)}
         return error
 
+    @rpc("requests", options=None)
+    @primary
+    async def importmulti(self, *args, **kwargs):
+        """(requests) (options)
+        Imports many privkeys at once, only writes each account and the index once.
+        Bismuthd: requests is a list of {"privkey", "account" (or "label"), "key_type"}, only privkey is required,
+        or {"address", "label"} for watch-only addresses.
+        options can be {"rescan": true or start block height}, see importprivkey.
+        returns a list of {"success", "address"} or {"success": false, "error": {"code", "message"}}, one per request.
+        Progress can be followed with getjobinfo("importmulti").
+        """
+        job = rescan_job = None
+        try:
+            wallet = self._wallet(args[0])
+            jobs = self._jobs(args[0])
+            requests = args[1]  # 0 is self
+            options = args[2] or {}
+            since = self._rescan_since(options.get("rescan", False))
+            rescan_job = jobs.new("rescan") if since is not None else None
+            job = jobs.new("importmulti")
+            results = await wallet.executor.run(wallet.import_privkeys, requests, job)
+            if rescan_job:
+                addresses = [result["address"] for result in results if result["success"]]
+                self._start_rescan(wallet, addresses, since, rescan_job)
+            return results
+        except Exception as e:
+            for pending in (job, rescan_job):
+                if pending:
+                    pending.cancel(e)
+            return {"version": self.config.version, "error": str(e)}
+
+    @rpc("address", label="", rescan=False)
+    @primary
+    async def importaddress(self, *args, **kwargs):
+        """(address) (label) (rescan)
+        Adds a watch-only address. Its transactions are tracked by the poller, in the local history.
+        Bismuthd: the poller runs as soon as there is a watch-only address, whatever poll is.
+        rescan is true (whole chain) or the block height to start from, see importprivkey.
+        returns Null on success
+        """
+        job = None
+        try:
+            wallet = self._wallet(args[0])
+            jobs = self._jobs(args[0])
+            address, label = args[1:3]  # 0 is self
+            since = self._rescan_since(args[3])
+            job = jobs.new("rescan") if since is not None else None
+            await wallet.executor.run(wallet.import_address, address, label)
+            if job:
+                self._start_rescan(wallet, [address], since, job)
+            return None
+        except Exception as e:
+            if job:
+                job.cancel(e)
+            return {"version": self.config.version, "error": str(e)}
+
+    @rpc(account="", address_type=None)
+    @primary
     async def getnewaddress(self, *args, **kwargs):
-        """(account)
+        """(account) (address_type)
         Returns a new bitcoin address for receiving payments.
         If (account) is specified payments received with the address will be credited to (account).
+        Bismuthd: address_type is one of RSA, ECDSA, ED25519. Defaults to the walletkeytype config.
         """
         try:
+            wallet = self._wallet(args[0])
             account = args[1]  #  0 is self
-            address = self.wallet.get_new_address(account)
+            key_type = args[2]
+            address = await wallet.executor.run(wallet.get_new_address, account, key_type)
             # address is a single string.
             return address
         except Exception as e:
             error = {"version": self.config.version, "error": str(e)}
         return error
 
+    @rpc("destination")
+    @primary
     async def backupwallet(self, *args, **kwargs):
         """(file_name)
         Backups the whole wallet directory in then given archive filename
+        Bismuthd: incremental, an existing archive only gets the new or changed files appended.
+        Progress with getjobinfo("backupwallet").
         """
+        job = None
         try:
+            wallet = self._wallet(args[0])
+            jobs = self._jobs(args[0])
             file_name = args[1]  #  0 is self
-            return self.wallet.backup_wallet(file_name)
+            job = jobs.new("backupwallet")
+            return await wallet.executor.run(wallet.backup_wallet, file_name, job)
         except Exception as e:
+            if job:
+                job.cancel(e)
             error = {"version": self.config.version, "error": str(e)}
         return error
 
+    @rpc("filename")
+    @primary
     async def dumpwallet(self, *args, **kwargs):
         """(file_name)
         Sends all the priv keys from the wallet
+        Progress with getjobinfo("dumpwallet").
         """
+        job = None
         try:
+            wallet = self._wallet(args[0])
+            jobs = self._jobs(args[0])
             file_name = args[1]  #  0 is self
-            return self.wallet.dump_wallet(file_name, self.config.version)
+            job = jobs.new("dumpwallet")
+            return await wallet.executor.run(
+                wallet.dump_wallet, file_name, self.config.version, job
+            )
         except Exception as e:
+            if job:
+                job.cancel(e)
             error = {"version": self.config.version, "error": str(e)}
         return error
 
+    @rpc("fromaddress", "toaddress", "amount", data="", timestamp=0)
+    @primary
     async def createrawtransaction(self, *args, **kwargs):
         """
         (fromaddress, toaddress, amount, optional data, optional timestamp)
@@ -423,19 +1011,16 @@ class Node:
         The format and interface of this method are *NOT* bitcoind compatible because of structural differences.
         """
         try:
-            from_address, to_address, amount = args[1:4]  #  0 is self
-            data = ""
-            timestamp = 0
-            if len(args) > 4:
-                data = args[4]
-            if len(args) > 5:
-                timestamp = args[5]
-            return self.wallet.make_unsigned_transaction(
+            wallet = self._wallet(args[0])
+            from_address, to_address, amount, data, timestamp = args[1:6]  #  0 is self
+            return wallet.make_unsigned_transaction(
                 from_address, to_address, amount, data, timestamp
             )
         except Exception as e:
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc("*transaction")
+    @primary
     async def signrawtransaction(self, *args, **kwargs):
         """
         Bismuthd: Adds signature to a raw transaction and returns the resulting raw transaction.
@@ -443,11 +1028,14 @@ class Node:
         The format and interface of this method are *NOT* bitcoind compatible because of structural differences.
         """
         try:
-            return self.wallet.sign_transaction(args[1:])
+            wallet = self._wallet(args[0])
+            return await wallet.executor.run(wallet.sign_transaction, args[1:])
         except Exception as e:
             # print(e)
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc("txid", format=False)
+    @sharedcache(ttl=10)
     async def getrawtransaction(self, *args, **kwargs):
         """
         (txid) (format)  -  Returns raw transaction representation for given transaction id, in json
@@ -456,24 +1044,21 @@ class Node:
         if format is True, then a full featured json dict with extra info is given.
         """
         try:
-            transaction = args[1]
+            transaction, format_option = args[1:3]
             # check tx format?
-            format_option = False
-            if len(args) > 2:
-                format_option = args[2]
             # TODO: check txid format and len (56)
             """
             if not re.match('[a..zA..Z0..9\+/=]{56}', transaction):
                 # broken regexp
                 raise ValueError("Bad Transaction format")
             """
-            return self.connection.command(
-                "api_gettransaction", [transaction, format_option]
-            )
+            return self.ledger.command("api_gettransaction", [transaction, format_option])
         except Exception as e:
             # print(e)
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc("txid", format=True)
+    @sharedcache(ttl=10)
     async def gettransaction(self, *args, **kwargs):
         """
         (txid) (format)  -  Returns raw transaction representation for given transaction id, in json
@@ -483,7 +1068,7 @@ class Node:
         """
         try:
             transaction = args[1]
-            res = self.connection.command("api_gettransaction", [transaction, True])
+            res = self.ledger.command("api_gettransaction", [transaction, True])
             # print("res", res)
             if "txid" in res:
                 blockhash = res["blockhash"]
@@ -579,6 +1164,8 @@ class Node:
         transaction["blockminer"] = mining_tx["address"]
         return transaction
 
+    @rpc("blockhash", verbosity=1)
+    @sharedcache(ttl=10)
     async def getblock(self, *args, **kwargs):
         """
         (hash) (verbosity)  -  gets a block with a particular hash from the local block database as a JSON object.
@@ -586,7 +1173,7 @@ class Node:
         """
         try:
             block_hash = args[1]
-            verbosity = args[2] if len(args) > 2 else 1
+            verbosity = args[2]
             if verbosity < 1:
                 verbosity = 1
             print("verbosity", verbosity)
@@ -595,7 +1182,7 @@ class Node:
                 # We have a recent node, can ask api_getblockfromhashextra
                 # Using a new call rather than previous one with a param for compatibility reason
                 # print("New ver")
-                res = self.connection.command("api_getblockfromhashextra", [block_hash])
+                res = self.ledger.command("api_getblockfromhashextra", [block_hash])
                 # print(res)
                 # This one just sends back block dict, not dict of a dict
                 previous_block_hash = res["previous_block_hash"]
@@ -604,7 +1191,7 @@ class Node:
 
             else:
                 print("Old ver")
-                res = self.connection.command("api_getblockfromhash", [block_hash])
+                res = self.ledger.command("api_getblockfromhash", [block_hash])
                 if len(res) == 1:
                     # Future proof: if we got a larger dict, it's a block and not a dict of height:block
                     res = list(res.values())[0]
@@ -675,6 +1262,8 @@ class Node:
             print(exc_type, fname, exc_tb.tb_lineno)
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc("fromaccount", "toaddress", "amount", minconf=1, comment="", comment_to="")
+    @primary
     async def sendfrom(self, *args, **kwargs):
         """
         Will send the given amount to the given address, ensuring the account has a valid balance
@@ -692,21 +1281,15 @@ class Node:
         Could be worked on with mempool modularization
         """
         try:
-            address, to_address, amount = args[1:4]
-            minconf = 1
-            if len(args) > 4:
-                minconf = args[4]
-            if minconf < 1:
-                minconf = 1
+            wallet = self._wallet(args[0])
+            address, to_address, amount, minconf, comment = args[1:6]
             # TODO: minconf is ignored for now, we just transmit to the node.
-            comment = ""
-            if len(args) > 5:
-                comment = args[5]
             # Create the raw transaction
-            transaction = self.wallet.sign_transaction(
-                self.wallet.make_unsigned_transaction(
+            transaction = await wallet.executor.run(
+                wallet.sign_transaction,
+                wallet.make_unsigned_transaction(
                     address, to_address, amount, comment
-                )
+                ),
             )
             void = self.connection.command("mpinsert", [[transaction]])
             # TODO: when implemented node side, use returned status code
@@ -716,6 +1299,8 @@ class Node:
         except Exception as e:
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc("address", "amount", comment="", comment_to="")
+    @primary
     async def sendtoaddress(self, *args, **kwargs):
         """
         (bismuthaddress) (amount) (comment) (comment-to)  -  (amount) is a real and is rounded to 8 decimal places.
@@ -728,19 +1313,18 @@ class Node:
         Could be worked on with mempool modularization
         """
         try:
-            to_address, amount = args[1:3]
+            wallet = self._wallet(args[0])
+            to_address, amount, comment = args[1:4]
             # TODO: minconf is ignored for now, we just transmit to the node.
-            comment = ""
-            if len(args) > 3:
-                comment = args[3]
             # default account address
-            address = self.wallet.get_account_address("")
+            address = await wallet.executor.run(wallet.get_account_address, "")
             # getLogger("tornado.application").warning("Using address {}".format(address))
             # Create the raw transaction
-            transaction = self.wallet.sign_transaction(
-                self.wallet.make_unsigned_transaction(
+            transaction = await wallet.executor.run(
+                wallet.sign_transaction,
+                wallet.make_unsigned_transaction(
                     address, to_address, amount, comment
-                )
+                ),
             )
             res = self.connection.command("mpinsert", [[transaction]])
             # TODO: when implemented node side, use returned status code
@@ -753,109 +1337,213 @@ class Node:
         except Exception as e:
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc("fromaccount", "amounts", minconf=1, comment="")
+    @primary
+    async def sendmany(self, *args, **kwargs):
+        """
+        (fromaccount) {address:amount,...} (minconf=1) (comment)  -  amounts are real and rounded to 8 decimal places.
+        Bismuth does not support one to many transactions: sends one transaction per recipient, from the first address
+        of the given account.
+        Transactions are signed in parallel on the executor pool, then sent to the node by chunks of mpinsertchunk.
+        Bismuthd specifics: returns a dict {address: {"txid": txid, "status": node answer}}
+        txid is None if the transaction was not accepted.
+        """
+        try:
+            wallet = self._wallet(args[0])
+            account, amounts, minconf, comment = args[1:5]
+            # TODO: minconf is ignored for now, we just transmit to the node.
+            address = await wallet.executor.run(wallet.get_account_address, account)
+            recipients = list(amounts.keys())
+            transactions = await wallet.executor.run(
+                wallet.sign_transactions,
+                [
+                    wallet.make_unsigned_transaction(
+                        address, to_address, amounts[to_address], comment
+                    )
+                    for to_address in recipients
+                ],
+            )
+            result = {}
+            chunk_size = max(1, self.config.mpinsertchunk)
+            for start in range(0, len(transactions), chunk_size):
+                chunk = transactions[start : start + chunk_size]
+                statuses = await self.executor.run(self._mpinsert, chunk)
+                for to_address, transaction, status in zip(
+                    recipients[start : start + chunk_size], chunk, statuses
+                ):
+                    result[to_address] = {
+                        "txid": transaction[4][:56] if status == "Success" else None,
+                        "status": status,
+                    }
+            return result
+        except Exception as e:
+            return {"version": self.config.version, "error": str(e)}
+
+    def _mpinsert(self, transactions: list) -> list:
+        """
+        Sends signed transactions to the node mempool in a single mpinsert.
+        Returns one status per transaction: the node only answers a log of messages, the last one is the
+        global status of the whole chunk - as for sendtoaddress. The other messages can't be matched to
+        the transactions by position, so they are not used.
+        """
+        res = self.connection.command("mpinsert", [transactions])
+        if not isinstance(res, list) or not res:
+            return [str(res)] * len(transactions)
+        # TODO: when implemented node side, use per transaction status.
+        return [str(res[-1])] * len(transactions)
+
     # @Asyncttlcache(ttl=10)
+    @rpc("address", minconf=1)
+    @primary
     async def getreceivedbyaddress(self, *args, **kwargs):
         """
         Takes a single address, a min conf count, and sends back the total received amount (!= balance).
         """
         try:
-            minconf = 1
-            if len(args) > 2:
-                minconf = args[2]
-            if minconf < 1:
-                minconf = 1
-            address = args[1]
-            total = self.connection.command("api_getreceived", [[address], minconf])
+            wallet = self._wallet(args[0])
+            address, minconf = args[1:3]
+            if wallet.is_watch_only(address):
+                # Watch-only addresses are served from the local history, the poller runs for them
+                return await wallet.executor.run(wallet.history.received, address, minconf)
+            total = self.ledger.command("api_getreceived", [[address], minconf])
             return total
         except Exception as e:
             info = {"version": self.config.version, "error": str(e)}
         return info
 
     # @Asyncttlcache(ttl=10)
+    @rpc("account", minconf=1)
+    @primary
     async def getreceivedbyaccount(self, *args, **kwargs):
         """
         Takes an account, a min conf count, and sends back the total received amount for addresses of this account (!= balance).
         """
         try:
-            minconf = 1
-            if len(args) > 2:
-                minconf = args[2]
-            if minconf < 1:
-                minconf = 1
-            account = args[1]
-            addresses = await self.getaddressesbyaccount(self, account)
-            total = self.connection.command("api_getreceived", [addresses, minconf])
+            account, minconf = args[1:3]
+            addresses = await self.getaddressesbyaccount(args[0], account)
+            total = self.ledger.command("api_getreceived", [addresses, minconf])
             return total
         except Exception as e:
             info = {"version": self.config.version, "error": str(e)}
         return info
 
     # @Asyncttlcache(ttl=10)
+    @rpc(minconf=1, include_empty=False)
+    @primary
     async def listreceivedbyaddress(self, *args, **kwargs):
         """
         Takes a single address, a min conf count, and sends back the total received amount (!= balance).
         """
         try:
-            minconf = 1
-            if len(args) > 1:
-                minconf = args[1]
-            if minconf < 1:
-                minconf = 1
-            include_empty = False
-            if len(args) > 2:
-                include_empty = args[2]
-            addresses = self.wallet.get_all_addresses()
+            wallet = self._wallet(args[0])
+            minconf, include_empty = args[1:3]
+            addresses = await wallet.executor.run(wallet.get_all_addresses)
             # mockup: [{"address":"moPhStktszZGwtVjziE7eoQ76ATQqfhMtK","account":"","amount":10.00000000,
             # "confirmations":1,"label":"",
             # "txids":["82790ce7d1fd0df0bc2ffd3cdfdd452e36a32b90885984213a9424f083f74df4"]}]
             all = self.connection.command(
                 "api_listreceived", [addresses, minconf, include_empty]
             )
-            return all
+            return Stream(all) if isinstance(all, list) else all
         except Exception as e:
             info = {"version": self.config.version, "error": str(e)}
         return info
 
     # @Asyncttlcache(ttl=10)
+    @rpc("account", minconf=1, include_empty=False)
+    @primary
     async def listreceivedbyaccount(self, *args, **kwargs):
         """
         Takes a single address, a min conf count, and sends back the total received amount (!= balance).
         """
         try:
-            minconf = 1
-            if len(args) > 2:
-                minconf = args[2]
-            if minconf < 1:
-                minconf = 1
-            include_empty = False
-            if len(args) > 3:
-                include_empty = args[3]
-            account = args[1]
-            addresses = await self.getaddressesbyaccount(self, account)
+            account, minconf, include_empty = args[1:4]
+            addresses = await self.getaddressesbyaccount(args[0], account)
             all = self.connection.command(
                 "api_listreceived", [addresses, minconf, include_empty]
             )
-            return all
+            return Stream(all) if isinstance(all, list) else all
         except Exception as e:
             info = {"version": self.config.version, "error": str(e)}
         return info
 
+    @rpc(account="*", count=10, skip=0, include_watchonly=False)
+    @primary
+    async def listtransactions(self, *args, **kwargs):
+        """(account="*") (count=10) (from=0) (include_watchonly=false)
+        Returns up to (count) most recent transactions skipping the first (from) ones, for (account) or all accounts.
+        Bismuthd: served from the local history, only holds the transactions seen by the poller (poll=1) or a rescan.
+        Watch-only addresses are matched to (account) by their label.
+        """
+        try:
+            wallet = self._wallet(args[0])
+            account = args[1]
+            count, skip = int(args[2]), int(args[3])
+            include_watchonly = bool(args[4])
+            addresses = await wallet.executor.run(
+                wallet.get_tracked_addresses, account, include_watchonly
+            )
+            rows = await wallet.executor.run(
+                wallet.history.transactions, addresses, count, skip
+            )
+            return self._history_entries(wallet, rows, addresses)
+        except Exception as e:
+            return {"version": self.config.version, "error": str(e)}
+
+    def _history_entries(self, wallet, rows, addresses, tip=None):
+        """
+        bitcoind like entries from local history rows, one per side for transactions between our addresses.
+        Confirmations are counted from tip, the synced height of the history by default.
+        """
+        if tip is None:
+            tip = wallet.history.height
+        entries = []
+        for block_height, timestamp, address, recipient, amount, signature, block_hash, fee, reward, operation, openfield in rows:
+            common = {
+                "confirmations": tip - block_height + 1,
+                "blockheight": block_height,
+                "blockhash": block_hash,
+                "txid": signature[:56],
+                "time": timestamp,
+                "operation": operation,
+                "comment": openfield,
+            }
+            if float(reward):
+                # Mining reward, address is the miner and recipient
+                sides = (("generate", recipient, float(reward)),)
+            else:
+                sides = (("send", address, -float(amount)), ("receive", recipient, float(amount)))
+            for category, side_address, side_amount in sides:
+                if side_address not in addresses:
+                    continue
+                entry = {
+                    "address": side_address,
+                    "account": wallet.address_to_account.get(
+                        side_address, wallet.watch_only.get(side_address, "")
+                    ),
+                    "category": category,
+                    "amount": side_amount,
+                    "involvesWatchonly": wallet.is_watch_only(side_address),
+                }
+                if category == "send":
+                    entry["fee"] = -float(fee)
+                entry.update(common)
+                entries.append(entry)
+        return entries
+
     # @Asyncttlcache(ttl=10)
+    @rpc(account="", minconf=1)
+    @primary
     async def getbalance(self, *args, **kwargs):
         """
         Returns the balance of a specific account (default account if empty)
         """
         try:
-            minconf = 1
-            if len(args) > 2:
-                minconf = args[2]
-            if minconf < 1:
-                minconf = 1
             # print('getb args', args)
-            account = args[1] if len(args) > 1 else ""
-            addresses = await self.getaddressesbyaccount(self, account)
+            account, minconf = args[1:3]
+            addresses = await self.getaddressesbyaccount(args[0], account)
             app_log.info("getbalance {} {} {}".format(account, addresses, minconf))
-            balance = self.connection.command("api_getbalance", [addresses, minconf])
+            balance = self.ledger.command("api_getbalance", [addresses, minconf])
             return balance
         except Exception as e:
             exc_type, exc_obj, exc_tb = sys.exc_info()
@@ -863,35 +1551,30 @@ class Node:
             print(exc_type, fname, exc_tb.tb_lineno)
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc("address", minconf=1)
     async def getbalancebyaddress(self, *args, **kwargs):
         """
         Returns the total balance of a specific address
         This is an extra command, not included in default bitcoin json-rpc
         """
         try:
-            minconf = 1
-            if len(args) > 2:
-                minconf = args[2]
-            if minconf < 1:
-                minconf = 1
-            address = args[1]
-            balance = self.connection.command("api_getbalance", [[address], minconf])
+            address, minconf = args[1:3]
+            balance = self.ledger.command("api_getbalance", [[address], minconf])
             return balance
         except Exception as e:
             return {"version": self.config.version, "error": str(e)}
 
     # @Asyncttlcache(ttl=10)
+    @rpc(minconf=1)
+    @primary
     async def listaccounts(self, *args, **kwargs):
         """
         List all accounts and balance of the wallet
         """
         try:
-            minconf = 1
-            if len(args) > 1:
-                minconf = args[1]
-            if minconf < 1:
-                minconf = 1
-            accounts = self.wallet.list_accounts()
+            wallet = self._wallet(args[0])
+            minconf = args[1]
+            accounts = await wallet.executor.run(wallet.list_accounts)
             balances = {}
             # TODO: better reuse the generator for rpcwallet and use dict comprehension,
             # or pass getbalance as a callback
@@ -899,21 +1582,24 @@ class Node:
                 app_log.info("Account {}".format(account))
                 # when called from here, self is not passed (but it is when called from the server,
                 # so we add it to keep args management coherent.
-                balances[account] = await self.getbalance(self, account, minconf)
+                balances[account] = await self.getbalance(args[0], account, minconf)
             return balances
         except Exception as e:
             return {"version": self.config.version, "error": str(e)}
 
     # @Asyncttlcache(ttl=10)
+    @rpc("address")
+    @primary
     async def validateaddress(self, *args, **kwargs):
         """
         Return information about bismuthaddress. https://bitcoin.org/en/developer-reference#validateaddress
         for Bismuth, returns a different info. TODO To be specified
         """
         try:
+            wallet = self._wallet(args[0])
             address = args[1]
             # returns offline and local wallet info
-            info = self.wallet.validate_address(address)
+            info = wallet.validate_address(address)
             # Then ask for online info like possible pubkey
             try:
                 online = self.connection.command("api_getaddressinfo", [address])
@@ -924,6 +1610,7 @@ class Node:
         except Exception as e:
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc()
     @Asyncttlcache(ttl=10)
     async def getpeerinfo(self, *args, **kwargs):
         """
@@ -937,6 +1624,7 @@ class Node:
             info = {"version": self.config.version, "error": str(e)}
         return info
 
+    @rpc("height")
     async def getblocksince(self, *args, **kwargs):
         """
         Returns the full blocks (including transactions) following a given block_height
@@ -944,12 +1632,13 @@ class Node:
         """
         try:
             since = args[1]
-            info = self.connection.command("api_getblocksince", [since])
-            return info
+            info = self.ledger.command("api_getblocksince", [since])
+            return Stream(info) if isinstance(info, list) else info
         except Exception as e:
             info = {"version": self.config.version, "error": str(e)}
         return info
 
+    @rpc("height", "minconf", "address")
     async def getaddresssince(self, *args, **kwargs):
         """
         Returns the transactions following a given block_height
@@ -957,24 +1646,28 @@ class Node:
         """
         try:
             since, minconf, address = args[1], args[2], args[3]
-            info = self.connection.command(
-                "api_getaddresssince", [since, minconf, address]
-            )
+            info = self.ledger.command("api_getaddresssince", [since, minconf, address])
+            if isinstance(info, dict) and isinstance(info.get("transactions"), list):
+                info["transactions"] = Stream(info["transactions"])
             return info
         except Exception as e:
             info = {"version": self.config.version, "error": str(e)}
         return info
 
+    @rpc("account")
+    @primary
     async def getaddressesbyaccount(self, *args, **kwargs):
         """
         List the addresses of the provided account args[1]
         """
         try:
+            wallet = self._wallet(args[0])
             account = args[1]  #  0 is self
-            return self.wallet.get_addresses_by_account(account)
+            return await wallet.executor.run(wallet.get_addresses_by_account, account)
         except Exception as e:
             return {"version": self.config.version, "error": str(e)}
 
+    @rpc(blockhash="", target_confirmations=1, include_watchonly=False)
     async def listsinceblock(self, *args, **kwargs):
         """
         List the transactions since the provided blockheight.
@@ -1165,12 +1858,90 @@ class Node:
     Here comes extra commands, that are *not* bitcoind compatible
     """
 
+    @rpc(count=10)
+    @primary
+    async def getdashboard(self, *args, **kwargs):
+        """(count=10)
+        Everything a wallet home page needs in a single call: tip and node info, total balance,
+        balance and default address of every account, (count) latest transactions from the local history (50 max),
+        or from the ledger, last 720 blocks, when the poller does not run.
+        Served from a snapshot the watchdog refreshes every 10 sec while the dashboard is in use,
+        "updated" is its timestamp. Only the very first call waits for the node.
+        """
+        try:
+            wallet = self._wallet(args[0])
+            name = getattr(args[0], "wallet_name", "")
+            count = int(args[1])
+            self.dashboard_requests[name] = time()
+            snapshot = self.dashboards.get(name)
+            if snapshot is None:
+                snapshot = await self.executor.run(self._refresh_dashboard, name)
+            dashboard = dict(snapshot)
+            dashboard["transactions"] = snapshot["transactions"][:count]
+            dashboard["encrypted"] = wallet.encrypted
+            dashboard["unlocked_until"] = wallet.unlocked_until()
+            return dashboard
+        except Exception as e:
+            return {"version": self.config.version, "error": str(e)}
+
+    @rpc()
+    async def getrpcinfo(self, *args, **kwargs):
+        """
+        https://bitcoin.org/en/developer-reference#getrpcinfo
+        Bismuthd: state of the per method bulkheads, {method: {"limit", "queue", "active", "waiting",
+        "max_waiting", "calls", "rejected", "timeouts"}}, of the websocket notifications, of the cache
+        and of the direct ledger reads (null if chain queries go to the node), for the worker process that answers.
+        """
+        try:
+            return {
+                "worker": self.workers.index if self.workers else 0,
+                "bulkheads": self.registry.bulkheads,
+                "notifications": self.hub.stats,
+                "cache": self.cache.stats,
+                "ledger": getattr(self.ledger, "stats", None),
+            }
+        except Exception as e:
+            return {"version": self.config.version, "error": str(e)}
+
+    @rpc()
+    async def getindexinfo(self, *args, **kwargs):
+        """
+        https://bitcoin.org/en/developer-reference#getindexinfo
+        Bismuthd: state of the sidecar ledger index, {"ledgerindex": {"synced", "best_block_height", "lag",
+        "rows_behind", "updated"}}, lag being in blocks. Empty if there's no index.
+        """
+        try:
+            info = self.ledger.index_info() if hasattr(self.ledger, "index_info") else {}
+            return {"ledgerindex": info} if info else {}
+        except Exception as e:
+            return {"version": self.config.version, "error": str(e)}
+
+    @rpc(name="")
+    @primary
+    async def getjobinfo(self, *args, **kwargs):
+        """
+        (name)  -  Progress of the long running jobs (encryptwallet, walletpassphrasechange...)
+        All jobs if no name is given.
+        """
+        try:
+            jobs = self._jobs(args[0])
+            name = args[1]
+            if not name:
+                return jobs.as_dict
+            job = jobs.get(name)
+            return job.as_dict if job else None
+        except Exception as e:
+            return {"version": self.config.version, "error": str(e)}
+
+    @rpc()
+    @primary
     async def reindexwallet(self, *args, **kwargs):
         """
         Force a reindex of the wallet accounts and addresses
         """
         try:
-            return self.wallet.reindex()
+            wallet = self._wallet(args[0])
+            return await wallet.executor.run(wallet.reindex)
         except Exception as e:
             return {"version": self.config.version, "error": str(e)}
 
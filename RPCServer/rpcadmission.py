@@ -0,0 +1,124 @@
+"""
+Admission control of the rpc calls.
+
+Per method bulkheads: at most "limit" calls of a method run at once, at most "queue" more wait
+for a slot, each no longer than "timeout" sec. Calls beyond that are rejected with a "server busy"
+error at once, so a flood of heavy calls can't starve the others.
+
+Configured by rpcbulkhead=<method>:<limit>:<queue> lines and rpcbulkheadtimeout.
+
+@EggPool
+"""
+
+import asyncio
+from logging import getLogger
+
+__version__ = "0.0.3"
+
+app_log = getLogger("tornado.application")
+
+
+class Bulkhead:
+    """
+    Concurrency limit and bounded wait queue of a single method. Only used from the IOLoop.
+    """
+
+    __slots__ = (
+        "name",
+        "limit",
+        "queue",
+        "timeout",
+        "semaphore",
+        "active",
+        "waiting",
+        "max_waiting",
+        "calls",
+        "rejected",
+        "timeouts",
+    )
+
+    def __init__(self, name, limit, queue=0, timeout=10):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue = max(0, queue)
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(self.limit)
+        self.active = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.calls = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    async def __aenter__(self):
+        if self.semaphore.locked():
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                raise ServerBusy(self._busy("queue full"))
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise ServerBusy(self._busy("timeout"))
+            finally:
+                self.waiting -= 1
+        else:
+            await self.semaphore.acquire()
+        self.active += 1
+        self.calls += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self.active -= 1
+        self.semaphore.release()
+
+    def _busy(self, reason) -> dict:
+        return {"method": self.name, "reason": reason, "active": self.active, "waiting": self.waiting}
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue": self.queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+def bulkheads_from_config(entries, timeout=10) -> dict:
+    """
+    {method: Bulkhead} from "method:limit:queue" entries. The last entry of a method wins.
+    """
+    bulkheads = {}
+    for entry in entries:
+        try:
+            name, limit, queue = entry.split(":")
+            bulkheads[name] = Bulkhead(name, int(limit), int(queue), timeout)
+        except ValueError:
+            raise ValueError("Invalid rpcbulkhead entry '{}', expected method:limit:queue".format(entry))
+    return bulkheads
+
+
+"""
+Custom exceptions
+"""
+
+
+class ServerBusy(Exception):
+    code = -33301
+    message = "Server busy, try again later"
+    data = None
+
+    def __init__(self, data=None):
+        super().__init__(data)
+        self.data = data
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
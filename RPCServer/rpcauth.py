@@ -0,0 +1,93 @@
+"""
+HTTP Basic auth of the rpc clients.
+
+Accepts rpcuser/rpcpassword, and bitcoind like rpcauth=<user>:<salt>$<hmac> entries
+where hmac is the hex HMAC-SHA256 of the password, keyed with the salt: the config then
+does not hold the password itself. All comparisons are constant time.
+
+Generate an entry with
+python3 -c "import rpcauth; print(rpcauth.make_rpcauth('user', 'password'))"
+
+@EggPool
+"""
+
+import hashlib
+import hmac
+import os
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from weakref import WeakKeyDictionary
+
+__version__ = "0.0.2"
+
+
+def make_rpcauth(user, password):
+    """
+    rpcauth config value for that user and password, with a random salt.
+    """
+    salt = os.urandom(16).hex()
+    digest = hmac.new(salt.encode("utf-8"), password.encode("utf-8"), hashlib.sha256).hexdigest()
+    return "{}:{}${}".format(user, salt, digest)
+
+
+class Auth:
+    """
+    Checks Authorization headers. Built once at startup, the expected header for rpcuser/rpcpassword is precomputed.
+    """
+
+    __slots__ = ("basic", "rpcuser", "users", "verified")
+
+    def __init__(self, rpcuser="", rpcpassword="", rpcauth=()):
+        self.basic = None
+        self.rpcuser = rpcuser
+        if rpcuser:
+            self.basic = (
+                "Basic " + b64encode("{}:{}".format(rpcuser, rpcpassword).encode("utf-8")).decode()
+            ).encode("utf-8")
+        # user: [(salt, hex digest)], a user can have several entries
+        self.users = {}
+        for entry in rpcauth:
+            user, _, salted = entry.partition(":")
+            salt, _, digest = salted.partition("$")
+            if not (user and salt and digest):
+                raise ValueError("Invalid rpcauth entry for user '{}'".format(user))
+            self.users.setdefault(user, []).append((salt, digest.lower()))
+        # (header, user) last accepted on each connection, so keep-alive and batch clients are verified once.
+        # Keys are the connection streams, entries go with them.
+        self.verified = WeakKeyDictionary()
+
+    def check(self, header, connection=None):
+        """
+        The user name if the Authorization header is valid, else None.
+        connection is an optional key for the per connection cache.
+        """
+        header = header.encode("utf-8")
+        if connection is not None:
+            known = self.verified.get(connection)
+            if known is not None and hmac.compare_digest(header, known[0]):
+                return known[1]
+        if self.basic is not None and hmac.compare_digest(header, self.basic):
+            user = self.rpcuser
+        else:
+            user = self._check_rpcauth(header)
+        if user and connection is not None:
+            self.verified[connection] = (header, user)
+        return user
+
+    def _check_rpcauth(self, header):
+        if not self.users or not header.startswith(b"Basic "):
+            return None
+        try:
+            user, _, password = b64decode(header[6:], validate=True).decode("utf-8").partition(":")
+        except (BinasciiError, UnicodeDecodeError):
+            return None
+        valid = False
+        for salt, digest in self.users.get(user, ()):
+            computed = hmac.new(salt.encode("utf-8"), password.encode("utf-8"), hashlib.sha256).hexdigest()
+            # No early exit, all entries of the user are checked
+            valid |= hmac.compare_digest(computed, digest)
+        return user if valid else None
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
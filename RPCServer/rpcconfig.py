@@ -15,18 +15,62 @@ app_log = getLogger("tornado.application")
 class Get:
     # "param_name":["type"] or "param_name"=["type","property_name"]
     vars = {"bismuthnode": ["str"], "bismuthpath": ["str"], "rpcuser": ["str"], "rpcpassword": ["str"],
-            "loglevel": ["str"], "verbose": ["int"], "rpcport": ["int"]}
+            "loglevel": ["str"], "verbose": ["int"], "rpcport": ["int"],
+            "walletkeycache": ["int"], "walletkeytype": ["str"], "executor": ["str"], "executorworkers": ["int"],
+            "mpinsertchunk": ["int"], "poll": ["int"],
+            "rescanworkers": ["int"], "wallets": ["list"], "walletdir": ["str"],
+            "rpccompress": ["int"], "rpccompressmin": ["int"], "rpccompresslevel": ["int"],
+            "rpcnokeepalive": ["int"], "rpcidletimeout": ["int"], "rpcclienttimeout": ["int"],
+            "rpcmaxbody": ["int"], "rpcmaxbuffer": ["int"], "rpcauth": ["multi"],
+            "rpcbulkhead": ["multi"], "rpcbulkheadtimeout": ["int"], "rpcallowip": ["multi"],
+            "rpciprate": ["int"], "rpcipburst": ["int"], "rpcuserrate": ["int"], "rpcuserburst": ["int"],
+            "rpcipv4prefix": ["int"], "rpcipv6prefix": ["int"], "notifyinterval": ["int"], "notifyqueue": ["int"],
+            "rpcprocesses": ["int"], "rpcunixsocket": ["str"], "rpcunixsocketmode": ["str"],
+            "ledgerindex": ["str"]}
 
     def __init__(self):
         self.verbose = 0
         self.rpcport = 8115
+        self.walletkeycache = 1000
+        self.walletkeytype = "RSA"
+        self.executor = "thread"
+        self.executorworkers = 0
+        self.mpinsertchunk = 100
+        self.poll = 0
+        self.rescanworkers = 4
+        self.wallets = []
+        self.walletdir = "wallets"
+        self.rpccompress = 1
+        self.rpccompressmin = 1024
+        self.rpccompresslevel = 6
+        self.rpcnokeepalive = 0
+        self.rpcidletimeout = 300
+        self.rpcclienttimeout = 30
+        self.rpcmaxbody = 10 * 1024 * 1024
+        self.rpcmaxbuffer = 10 * 1024 * 1024
+        self.rpcauth = []
+        self.rpcbulkhead = []
+        self.rpcbulkheadtimeout = 10
+        self.rpcallowip = []
+        self.rpciprate = 0
+        self.rpcipburst = 0
+        self.rpcuserrate = 0
+        self.rpcuserburst = 0
+        self.rpcipv4prefix = 32
+        self.rpcipv6prefix = 64
+        self.notifyinterval = 2
+        self.notifyqueue = 256
+        self.rpcprocesses = 1
+        self.rpcunixsocket = ""
+        self.rpcunixsocketmode = "660"
+        self.ledgerindex = ""
         self.read()
 
     def load_file(self, filename):
         print("Loading", filename)
         for line in open(filename):
             if '=' in line:
-                left, right = map(str.strip, line.rstrip("\n").split("="))
+                left, right = map(str.strip, line.rstrip("\n").split("=", 1))
                 if not left in self.vars:
                     # Warn for unknown param?
                     continue
@@ -35,6 +79,9 @@ class Get:
                     right = int(right)
                 elif params[0] == "list":
                     right = [item.strip() for item in right.split(",")]
+                elif params[0] == "multi":
+                    # Can be given several times, each line adds an item
+                    right = getattr(self, left, []) + [right]
                 else:
                     # treat as "str"
                     pass
@@ -18,11 +18,21 @@ LTIMEOUT = 45
 # Fixed header length
 SLEN = 10
 
-__version__ = "0.1.7"
+__version__ = "0.1.8"
 
 app_log = getLogger("tornado.application")
 
 
+def node_address(bismuthnode):
+    """
+    Connection address from the bismuthnode config: (ip, port) for "ip:port", else the path of a unix socket.
+    """
+    if ":" not in bismuthnode:
+        return bismuthnode
+    node_ip, node_port = bismuthnode.rsplit(":", 1)
+    return node_ip, int(node_port)
+
+
 class Connection(object):
     """Connection to a Bismuth Node. Handles auto reconnect when needed"""
 
@@ -31,7 +41,7 @@ class Connection(object):
     __slots__ = ("ipport", "verbose", "sdef", "stats", "last_activity", "command_lock")
 
     def __init__(self, ipport, verbose=False):
-        """ipport is an (ip, port) tuple"""
+        """ipport is an (ip, port) tuple, or the path of the node unix socket"""
         self.ipport = ipport
         self.verbose = verbose
         self.sdef = None
@@ -45,7 +55,10 @@ class Connection(object):
             try:
                 if self.verbose:
                     app_log.info("Connecting to {}".format(self.ipport))
-                self.sdef = socket.socket()
+                if isinstance(self.ipport, str):
+                    self.sdef = socket.socket(socket.AF_UNIX)
+                else:
+                    self.sdef = socket.socket()
                 self.sdef.connect(self.ipport)
                 self.last_activity = time.time()
             except Exception as e:
@@ -0,0 +1,109 @@
+"""
+Executor layer for Bismuth RPC Server
+
+Keeps the IOLoop responsive: blocking wallet calls are run in a thread pool and awaited,
+CPU heavy crypto (key generation, passphrase derivation, signatures) is dispatched to a
+configurable thread or process pool.
+
+@EggPool
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from logging import getLogger
+
+from tornado.ioloop import IOLoop
+
+__version__ = "0.0.1"
+
+# Supported crypto pool modes
+MODES = ("thread", "process")
+
+app_log = getLogger("tornado.application")
+
+
+class Executor:
+    """
+    Two pools:
+    - wallet_pool, threads running whole wallet methods, so async handlers can await them.
+    - crypto_pool, threads or processes running picklable crypto functions.
+    Crypto calls are blocking, and meant to be issued from the wallet threads, not from the IOLoop.
+    """
+
+    __slots__ = ("mode", "workers", "verbose", "wallet_pool", "crypto_pool", "owns_crypto_pool")
+
+    def __init__(self, mode="thread", workers=0, verbose=False, crypto_pool=None):
+        if mode not in MODES:
+            raise ValueError("Unknown executor mode {}".format(mode))
+        self.mode = mode
+        self.verbose = verbose
+        # 0 means one worker per core
+        self.workers = workers if workers > 0 else (os.cpu_count() or 2)
+        self.wallet_pool = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="wallet"
+        )
+        # An executor can share the crypto pool of another one, and only have its own wallet pool.
+        self.owns_crypto_pool = crypto_pool is None
+        if crypto_pool is not None:
+            self.crypto_pool = crypto_pool
+        elif mode == "process":
+            # spawn, since forking a process with running threads is not safe.
+            self.crypto_pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            self.crypto_pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="crypto"
+            )
+        if self.verbose:
+            app_log.info(
+                "Executor: {} crypto pool, {} workers".format(self.mode, self.workers)
+            )
+
+    @property
+    def processes(self) -> bool:
+        """True if crypto runs in other processes, so only picklable data can be sent."""
+        return self.mode == "process"
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs a blocking call in the wallet thread pool and awaits its result.
+        To be used from async handlers.
+        """
+        return await IOLoop.current().run_in_executor(
+            self.wallet_pool, partial(func, *args, **kwargs)
+        )
+
+    def with_own_wallet_pool(self):
+        """
+        A new executor sharing this crypto pool, with its own wallet pool: used by each wallet so that
+        a long call on a wallet never waits for the calls of another one.
+        """
+        return Executor(
+            mode=self.mode, workers=self.workers, verbose=self.verbose, crypto_pool=self.crypto_pool
+        )
+
+    def crypto(self, func, *args):
+        """
+        Runs a crypto function on the crypto pool, waits for and returns its result.
+        func and args have to be picklable in process mode.
+        """
+        return self.crypto_pool.submit(func, *args).result()
+
+    def crypto_map(self, func, *iterables) -> list:
+        """
+        Same as crypto, for a batch of calls run in parallel. Results are in order.
+        """
+        return list(self.crypto_pool.map(func, *iterables))
+
+    def stop(self):
+        if self.owns_crypto_pool:
+            self.crypto_pool.shutdown(wait=False)
+        self.wallet_pool.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
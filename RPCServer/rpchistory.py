@@ -0,0 +1,152 @@
+"""
+Local transaction history of the addresses tracked by the wallet (own and watch-only).
+
+Filled by the node poller from api_getblocksince and by the rescans, so received totals and history
+can be served without asking the node for every address.
+
+@EggPool
+"""
+
+import sqlite3
+import threading
+from decimal import Decimal
+
+__version__ = "0.0.2"
+
+HISTORY_FILE = "history.db"
+
+SQL_CREATE = (
+    "CREATE TABLE IF NOT EXISTS transactions (block_height INTEGER, timestamp NUMERIC, "
+    "address TEXT, recipient TEXT, amount TEXT, signature TEXT UNIQUE, block_hash TEXT, "
+    "fee TEXT, reward TEXT, operation TEXT, openfield TEXT)",
+    # Per address history, most recent first, straight from the index
+    "DROP INDEX IF EXISTS idx_address",
+    "DROP INDEX IF EXISTS idx_recipient",
+    "CREATE INDEX IF NOT EXISTS idx_address_height ON transactions(address, block_height, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_recipient_height ON transactions(recipient, block_height, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_height ON transactions(block_height)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+)
+
+# Column order, same as the node ledger rows minus the pubkey
+COLUMNS = (
+    "block_height, timestamp, address, recipient, amount, signature, block_hash, "
+    "fee, reward, operation, openfield"
+)
+
+# Max addresses per "IN (...)" query, below the sqlite variables limit
+IN_CHUNK = 500
+
+
+class History:
+    """
+    sqlite store of ledger rows. Rows are unique by signature, so overlapping polls or rescans are harmless.
+    """
+
+    __slots__ = ("fname", "db", "lock", "height", "polled")
+
+    def __init__(self, fname):
+        self.fname = fname
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(fname, timeout=10, check_same_thread=False)
+        with self.lock:
+            for sql in SQL_CREATE:
+                self.db.execute(sql)
+            meta = dict(self.db.execute("SELECT key, value FROM meta").fetchall())
+            self.db.commit()
+        # Last block height the history is synced to, by the poller or a rescan
+        self.height = int(meta.get("height", 0))
+        # Last block height seen by the poller, where it resumes. Older files only had "height".
+        self.polled = int(meta.get("polled", self.height))
+
+    def add(self, transactions, height=0):
+        """
+        Stores ledger rows as sent by the node
+        [block_height, timestamp, address, recipient, amount, signature, pubkey, block_hash, fee, reward, operation, openfield]
+        and optionally moves the polled and synced heights: height is given by the poller only.
+        """
+        rows = [
+            (tx[0], tx[1], tx[2], tx[3], str(tx[4]), tx[5], tx[7], str(tx[8]), str(tx[9]), tx[10], tx[11])
+            for tx in transactions
+        ]
+        with self.lock:
+            if rows:
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO transactions ({}) VALUES (?,?,?,?,?,?,?,?,?,?,?)".format(COLUMNS),
+                    rows,
+                )
+            if height > self.polled:
+                self.polled = height
+                self._set_meta("polled", height)
+            self._advance(height)
+            self.db.commit()
+
+    def synced(self, height):
+        """
+        Moves the synced height only, once a rescan is done: the poller still resumes where it stopped,
+        not to miss the blocks of the other addresses.
+        """
+        with self.lock:
+            self._advance(height)
+            self.db.commit()
+
+    def _advance(self, height):
+        # Caller holds the lock
+        if height > self.height:
+            self.height = height
+            self._set_meta("height", height)
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def received(self, address, minconf=1):
+        """
+        Total received by address, in blocks with at least minconf confirmations.
+        """
+        max_height = self.height - minconf + 1
+        with self.lock:
+            res = self.db.execute(
+                "SELECT amount FROM transactions WHERE recipient = ? AND block_height <= ?",
+                (address, max_height),
+            ).fetchall()
+        total = sum((Decimal(amount) for amount, in res), Decimal(0))
+        return float(round(total, 8))
+
+    def transactions(self, addresses=None, count=10, skip=0):
+        """
+        Most recent rows involving any of the addresses (a set), all rows if None.
+        Sender and recipient sides are index queries, at most skip + count rows each, merged here.
+        """
+        with self.lock:
+            if addresses is None:
+                return self.db.execute(
+                    "SELECT {} FROM transactions ORDER BY block_height DESC, timestamp DESC LIMIT ? OFFSET ?".format(
+                        COLUMNS
+                    ),
+                    (count, skip),
+                ).fetchall()
+            limit = skip + count
+            addresses = list(addresses)
+            # By signature: a row between two tracked addresses comes from both sides
+            rows = {}
+            for start in range(0, len(addresses), IN_CHUNK):
+                chunk = addresses[start:start + IN_CHUNK]
+                for column in ("address", "recipient"):
+                    for row in self.db.execute(
+                        "SELECT {} FROM transactions WHERE {} IN ({}) "
+                        "ORDER BY block_height DESC, timestamp DESC LIMIT ?".format(
+                            COLUMNS, column, ",".join("?" * len(chunk))
+                        ),
+                        chunk + [limit],
+                    ):
+                        rows[row[5]] = row
+        res = sorted(rows.values(), key=lambda row: (row[0], row[1]), reverse=True)
+        return res[skip:limit]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -0,0 +1,134 @@
+"""
+Progress tracking of long running wallet jobs (encryption, rescans, backups...)
+so that they can be queried via rpc while they run.
+
+@EggPool
+"""
+
+import threading
+from time import time
+
+__version__ = "0.0.2"
+
+
+class Job:
+    """
+    State and progress of a single job. Updated from worker threads, read from the IOLoop.
+    """
+
+    __slots__ = ("name", "status", "total", "done", "started", "ended", "error", "lock")
+
+    def __init__(self, name):
+        self.name = name
+        self.status = "pending"
+        self.total = 0
+        self.done = 0
+        self.started = 0
+        self.ended = 0
+        self.error = ""
+        self.lock = threading.Lock()
+
+    def start(self, total=0):
+        with self.lock:
+            self.status = "running"
+            self.total = total
+            self.done = 0
+            self.started = int(time())
+            self.ended = 0
+            self.error = ""
+
+    def advance(self, count=1):
+        with self.lock:
+            self.done += count
+
+    def set_total(self, total):
+        with self.lock:
+            self.total = total
+
+    def finish(self, error=""):
+        with self.lock:
+            self.status = "error" if error else "done"
+            self.error = str(error)
+            self.ended = int(time())
+
+    def cancel(self, error):
+        """
+        Ends a job that never started, its call failed before. A started job ends by itself.
+        """
+        with self.lock:
+            if self.status == "pending":
+                self.status = "error"
+                self.error = str(error)
+                self.ended = int(time())
+
+    @property
+    def running(self) -> bool:
+        """
+        Not finished yet: a pending job is about to run, it counts as well.
+        """
+        return self.status in ("pending", "running")
+
+    @property
+    def as_dict(self) -> dict:
+        with self.lock:
+            progress = min(100.0 * self.done / self.total, 100.0) if self.total else 0
+            if self.status == "done":
+                progress = 100.0
+            return {
+                "name": self.name,
+                "status": self.status,
+                "total": self.total,
+                "done": self.done,
+                "progress": round(progress, 2),
+                "started": self.started,
+                "ended": self.ended,
+                "error": self.error,
+            }
+
+
+class Jobs:
+    """
+    Registry of the jobs, by name. Only the last job of a given name is kept.
+    """
+
+    __slots__ = ("jobs", "lock")
+
+    def __init__(self):
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def new(self, name) -> Job:
+        """
+        Registers and returns a new job. Raises if a job of the same name is still pending or running.
+        """
+        with self.lock:
+            if name in self.jobs and self.jobs[name].running:
+                raise JobRunning("{} is already running".format(name))
+            job = Job(name)
+            self.jobs[name] = job
+            return job
+
+    def get(self, name):
+        with self.lock:
+            return self.jobs.get(name, None)
+
+    @property
+    def as_dict(self) -> dict:
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return {job.name: job.as_dict for job in jobs}
+
+
+"""
+Custom exceptions
+"""
+
+
+class JobRunning(Exception):
+    code = -33101
+    message = "A job of the same kind is already running"
+    data = None
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
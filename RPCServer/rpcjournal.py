@@ -0,0 +1,250 @@
+"""
+Write-ahead journal for the wallet files.
+
+Every wallet write is first appended to the journal, then applied to its file with a temp file
+and a rename. Concurrent writers are grouped: one of them commits the whole pending batch with
+a single fsync, the others just wait for it. Applied files are only fsynced at checkpoint time,
+when the journal is truncated. A crash at any point is recovered by replaying the journal.
+
+@EggPool
+"""
+
+import os
+import threading
+import zlib
+from logging import getLogger
+
+__version__ = "0.0.1"
+
+JOURNAL_FILE = "journal.log"
+# Journal size that triggers a checkpoint
+CHECKPOINT_SIZE = 4 * 1024 * 1024
+
+app_log = getLogger("tornado.application")
+
+
+class Journal:
+    """
+    Journal of a wallet directory. Records are one line each:
+    crc32 of the payload, space, relative file name, tab, json content (empty for a delete).
+    """
+
+    __slots__ = (
+        "path",
+        "fname",
+        "checkpoint_size",
+        "verbose",
+        "file",
+        "cond",
+        "pending",
+        "batch_id",
+        "committed",
+        "committing",
+        "error_batch",
+        "error",
+        "dirty",
+        "fsyncs",
+        "records",
+    )
+
+    def __init__(self, path, checkpoint_size=CHECKPOINT_SIZE, verbose=False):
+        self.path = path
+        self.fname = os.path.join(path, JOURNAL_FILE)
+        self.checkpoint_size = checkpoint_size
+        self.verbose = verbose
+        self.file = None
+        self.cond = threading.Condition()
+        # Records waiting for the next commit, by relative file name: only the last write counts.
+        self.pending = {}
+        # Id of the batch pending records will be part of
+        self.batch_id = 1
+        self.committed = 0
+        self.committing = False
+        self.error_batch = 0
+        self.error = None
+        # Files applied since last checkpoint, not fsynced yet
+        self.dirty = set()
+        # Stats
+        self.fsyncs = 0
+        self.records = 0
+
+    def recover(self):
+        """
+        Replays the complete records of the journal, makes them durable and truncates the journal.
+        To be called before any write, when loading the wallet.
+        """
+        records = []
+        if os.path.exists(self.fname):
+            with open(self.fname, "rb") as journal:
+                for line in journal:
+                    record = self._parse(line)
+                    if record is None:
+                        # Torn write of a batch that was never acknowledged, and nothing can follow.
+                        break
+                    records.append(record)
+        if records:
+            app_log.warning("Wallet journal: replaying {} writes".format(len(records)))
+            for rel_fname, content in records:
+                self._apply(rel_fname, content)
+        self.file = open(self.fname, "ab")
+        self._checkpoint()
+
+    def write(self, fname, content):
+        """
+        Durably replaces fname with content, a json string. Returns once written.
+        content can also be a callable returning the string, it is then called at commit time
+        and gives the latest state even if several threads updated it concurrently.
+        """
+        self._submit(os.path.relpath(fname, self.path), content)
+
+    def remove(self, fname):
+        """
+        Durably deletes fname.
+        """
+        self._submit(os.path.relpath(fname, self.path), "")
+
+    def close(self):
+        with self.cond:
+            while self.committing:
+                self.cond.wait()
+            if self.file:
+                self._checkpoint()
+                self.file.close()
+                self.file = None
+
+    @property
+    def stats(self) -> dict:
+        return {"records": self.records, "fsyncs": self.fsyncs, "batches": self.committed}
+
+    def _submit(self, rel_fname, content):
+        with self.cond:
+            self.pending[rel_fname] = content
+            my_batch = self.batch_id
+            while self.committing:
+                self.cond.wait()
+            if self.committed >= my_batch:
+                # A previous leader committed our batch while we were waiting
+                if self.error_batch == my_batch:
+                    raise JournalError(self.error)
+                return
+            # We are the leader for this batch
+            self.committing = True
+            batch = self.pending
+            self.pending = {}
+            self.batch_id += 1
+        error = None
+        try:
+            self._commit(batch)
+        except Exception as e:
+            app_log.error("Wallet journal: commit failed {}".format(e))
+            error = e
+        with self.cond:
+            self.committing = False
+            self.committed = my_batch
+            if error:
+                self.error_batch = my_batch
+                self.error = str(error)
+            self.cond.notify_all()
+        if error:
+            raise JournalError(str(error))
+
+    def _commit(self, batch):
+        lines = []
+        for rel_fname, content in batch.items():
+            if callable(content):
+                content = content()
+                batch[rel_fname] = content
+            payload = "{}\t{}".format(rel_fname, content).encode("utf-8")
+            lines.append(b"%08x %s\n" % (zlib.crc32(payload), payload))
+        self.file.write(b"".join(lines))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.fsyncs += 1
+        self.records += len(batch)
+        # Now durable, the files themselves can be written lazily.
+        for rel_fname, content in batch.items():
+            self._apply(rel_fname, content)
+        if self.file.tell() >= self.checkpoint_size:
+            self._checkpoint()
+
+    def _apply(self, rel_fname, content):
+        fname = os.path.join(self.path, rel_fname)
+        if content == "":
+            try:
+                os.remove(fname)
+            except FileNotFoundError:
+                pass
+        else:
+            os.makedirs(os.path.dirname(fname), exist_ok=True)
+            tmp_fname = fname + ".tmp"
+            with open(tmp_fname, "w") as outfile:
+                outfile.write(content)
+            os.replace(tmp_fname, fname)
+        self.dirty.add(fname)
+
+    def _checkpoint(self):
+        """
+        fsyncs every file applied since last checkpoint, then empties the journal.
+        """
+        dirs = set()
+        for fname in self.dirty:
+            dirs.add(os.path.dirname(fname))
+            try:
+                with open(fname, "rb") as applied:
+                    os.fsync(applied.fileno())
+                    self.fsyncs += 1
+            except FileNotFoundError:
+                pass
+        for dirname in dirs:
+            _fsync_dir(dirname)
+        self.dirty = set()
+        self.file.truncate(0)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.fsyncs += 1
+
+    def _parse(self, line):
+        """
+        Returns (rel_fname, content) from a journal line, None if incomplete or corrupted.
+        """
+        if not line.endswith(b"\n"):
+            return None
+        try:
+            crc, payload = line[:-1].split(b" ", 1)
+            if int(crc, 16) != zlib.crc32(payload):
+                return None
+            rel_fname, content = payload.decode("utf-8").split("\t", 1)
+            return rel_fname, content
+        except Exception:
+            return None
+
+
+def _fsync_dir(dirname):
+    """
+    Makes renames in dirname durable. Not possible on every platform.
+    """
+    try:
+        fd = os.open(dirname, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+"""
+Custom exceptions
+"""
+
+
+class JournalError(Exception):
+    code = -33201
+    message = "Wallet write failed"
+    data = None
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
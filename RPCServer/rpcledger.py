@@ -0,0 +1,352 @@
+"""
+Read-only access to the ledger of a node running on the same host.
+
+The node sqlite ledger (static/ledger.db in bismuthpath) is opened with mode=ro: the server can never write to it,
+and with a WAL ledger its reads never wait for the node writes. The chain commands below are answered from it
+in the same format as the node api would, everything else - and any sqlite error - goes to the node socket.
+
+With a sidecar index (see rpcledgerindex), attached to the same connection, the queries by address, txid and
+block hash are index only there, then fetch the ledger rows by rowid. Only while the index is in sync with
+the ledger tip: else, as when there's no index, they run on the ledger and its own indexes.
+
+@EggPool
+"""
+
+import os
+import sqlite3
+import threading
+from base64 import b64decode
+from logging import getLogger
+from urllib.parse import quote
+
+import rpcledgerindex
+
+__version__ = "0.0.3"
+
+app_log = getLogger("tornado.application")
+
+# Where the ledger lives in the node directory
+LEDGER_FILE = os.path.join("static", "ledger.db")
+
+# Same limits as the node api
+BLOCKS_SINCE = 10
+ADDRESS_SINCE_BLOCKS = 720
+
+# node command: Ledger method answering it
+COMMANDS = {
+    "api_getbalance": "get_balance",
+    "api_getreceived": "get_received",
+    "api_gettransaction": "get_transaction",
+    "blockget": "block_get",
+    "api_getblockfromhash": "get_block_from_hash",
+    "api_getblockfromhashextra": "get_block_from_hash_extra",
+    "api_getblocksince": "get_block_since",
+    "api_getaddresssince": "get_address_since",
+}
+
+
+def ledger_path(bismuthpath):
+    """
+    Path of the node ledger from the bismuthpath config, the node directory or the ledger file itself.
+    None if there's no ledger there.
+    """
+    if not bismuthpath:
+        return None
+    path = bismuthpath if os.path.isfile(bismuthpath) else os.path.join(bismuthpath, LEDGER_FILE)
+    return os.path.abspath(path) if os.path.isfile(path) else None
+
+
+def prefix_range(prefix):
+    """
+    (low, high) bounds of the strings starting with prefix, so that a signature prefix is an index range, not a LIKE.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class Ledger:
+    """
+    Chain queries, with the same command() as rpcconnections.Connection. connection is the node one, for the rest.
+    index_path is the sidecar index, if any.
+    """
+
+    __slots__ = (
+        "path", "db", "lock", "connection", "served", "fallbacks", "index_path", "indexed", "indexed_reads"
+    )
+
+    def __init__(self, path, connection, index_path=None):
+        self.path = path
+        self.connection = connection
+        self.lock = threading.Lock()
+        self.served = 0
+        self.fallbacks = 0
+        self.index_path = index_path
+        # True while the index is in sync, for the command being served
+        self.indexed = False
+        self.indexed_reads = 0
+        # Never creates the file, fails if it's not there
+        self.db = sqlite3.connect(
+            "file:{}?mode=ro".format(quote(path)), uri=True, timeout=1, check_same_thread=False
+        )
+        self.db.execute("SELECT 1 FROM transactions LIMIT 1")
+        if index_path:
+            rpcledgerindex.create(index_path)
+            self.db.execute("ATTACH DATABASE ? AS idx", (index_path,))
+
+    def command(self, command, options=None):
+        """
+        Answer of the node to the command, from the ledger if possible.
+        """
+        method = COMMANDS.get(command)
+        if method is not None:
+            try:
+                with self.lock:
+                    self.indexed = self._synced()
+                    result = getattr(self, method)(*(options or ()))
+                self.served += 1
+                if self.indexed:
+                    self.indexed_reads += 1
+                return result
+            except sqlite3.Error as e:
+                self.fallbacks += 1
+                app_log.warning("Ledger read failed ({}), asking the node".format(e))
+        return self.connection.command(command, options)
+
+    def close(self):
+        self.db.close()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "served": self.served,
+            "fallbacks": self.fallbacks,
+            "indexed": self.indexed_reads,
+        }
+
+    def index_info(self) -> dict:
+        """
+        State of the sidecar index: indexed height, blocks and ledger rows it lags behind. {} if there's none.
+        """
+        if not self.index_path:
+            return {}
+        with self.lock:
+            tip_rowid, tip_txid = rpcledgerindex.ledger_tip(self.db, "main.")
+            last_rowid, last_txid, updated = self.db.execute(
+                "SELECT last_rowid, last_txid, updated FROM idx.state"
+            ).fetchone()
+            height = self.db.execute("SELECT MAX(height) FROM idx.blocks").fetchone()[0] or 0
+            tip = self.db.execute(
+                "SELECT ABS(block_height) FROM transactions WHERE rowid=?", (tip_rowid,)
+            ).fetchone()
+        return {
+            "synced": (tip_rowid, tip_txid) == (last_rowid, last_txid),
+            "best_block_height": height,
+            "lag": max((tip[0] if tip else 0) - height, 0),
+            "rows_behind": max(tip_rowid - last_rowid, 0),
+            "updated": int(updated),
+        }
+
+    """
+    Queries, caller holds the lock
+    """
+
+    def _synced(self) -> bool:
+        """
+        True if the sidecar index has all the ledger rows, up to the last one.
+        """
+        if not self.index_path:
+            return False
+        state = self.db.execute("SELECT last_rowid, last_txid FROM idx.state").fetchone()
+        return rpcledgerindex.ledger_tip(self.db, "main.") == tuple(state)
+
+    def _height(self) -> int:
+        if self.indexed:
+            return self.db.execute("SELECT MAX(height) FROM idx.blocks").fetchone()[0] or 0
+        return self.db.execute("SELECT MAX(block_height) FROM transactions").fetchone()[0] or 0
+
+    def _confirmed_height(self, minconf) -> int:
+        return self._height() - max(int(minconf), 1) + 1
+
+    def get_balance(self, addresses, minconf=1):
+        """
+        Credits and rewards minus debits and fees, of the blocks with at least minconf confirmations.
+        """
+        height = self._confirmed_height(minconf)
+        # Same columns, covering indexes there
+        table = "idx.tx" if self.indexed else "transactions"
+        balance = 0
+        for address in addresses:
+            credit = self.db.execute(
+                "SELECT SUM(amount) + SUM(reward) FROM {} WHERE recipient=? AND block_height<=?".format(table),
+                (address, height),
+            ).fetchone()[0]
+            debit = self.db.execute(
+                "SELECT SUM(amount) + SUM(fee) FROM {} WHERE address=? AND block_height<=?".format(table),
+                (address, height),
+            ).fetchone()[0]
+            balance += (credit or 0) - (debit or 0)
+        return round(balance, 8)
+
+    def get_received(self, addresses, minconf=1):
+        height = self._confirmed_height(minconf)
+        table = "idx.tx" if self.indexed else "transactions"
+        received = 0
+        for address in addresses:
+            amount = self.db.execute(
+                "SELECT SUM(amount) FROM {} WHERE recipient=? AND block_height<=?".format(table), (address, height)
+            ).fetchone()[0]
+            received += amount or 0
+        return round(received, 8)
+
+    def get_transaction(self, txid, format_option=False):
+        """
+        The transaction row for format False, None if not found. A dict with its block info for format True.
+        """
+        raw = None
+        if txid and self.indexed:
+            # txids are 56 chars, longer ones can only be a full signature
+            raw = self.db.execute(
+                "SELECT t.* FROM idx.tx AS i JOIN transactions AS t ON t.rowid=i.ledger_rowid "
+                "WHERE i.txid>=? AND i.txid<? AND t.signature>=? AND t.signature<? LIMIT 1",
+                prefix_range(txid[:56]) + prefix_range(txid),
+            ).fetchone()
+        elif txid:
+            raw = self.db.execute(
+                "SELECT * FROM transactions WHERE signature>=? AND signature<? LIMIT 1", prefix_range(txid)
+            ).fetchone()
+        if not format_option:
+            return list(raw) if raw else None
+        if not raw:
+            return {}
+        block = self.db.execute(
+            # Untyped column, "0" > 0 for sqlite
+            "SELECT timestamp, address FROM transactions WHERE block_height=? AND CAST(reward AS REAL)>0", (raw[0],)
+        ).fetchone()
+        # No reward row for mirror blocks
+        block_time, block_miner = block if block else (raw[1], "")
+        return {
+            "txid": raw[5][:56],
+            "time": raw[1],
+            "hash": raw[5],
+            "address": raw[2],
+            "recipient": raw[3],
+            "amount": raw[4],
+            "fee": raw[8],
+            "reward": raw[9],
+            "operation": raw[10],
+            "openfield": raw[11],
+            "pubkey": b64decode(raw[6]).decode("utf-8"),
+            "blockhash": raw[7],
+            "blockheight": raw[0],
+            # The tip counts for one, as for the balances
+            "confirmations": self._height() - raw[0] + 1,
+            "blocktime": block_time,
+            "blockminer": block_miner,
+        }
+
+    def block_get(self, height):
+        return [list(row) for row in self.db.execute("SELECT * FROM transactions WHERE block_height=?", (int(height),))]
+
+    def get_block_from_hash(self, block_hash):
+        """
+        {height: block} as the node sends it, {} if not found.
+        """
+        if self.indexed:
+            # Mirror rows may sit in the rowid range of the block
+            rows = self.db.execute(
+                "SELECT t.* FROM idx.blocks AS b JOIN transactions AS t ON t.rowid BETWEEN b.first_rowid AND "
+                "b.last_rowid WHERE b.hash=? AND t.block_hash=?",
+                (block_hash, block_hash),
+            ).fetchall()
+        else:
+            rows = self.db.execute("SELECT * FROM transactions WHERE block_hash=?", (block_hash,)).fetchall()
+        blocks = {}
+        for row in rows:
+            block = blocks.setdefault(row[0], {"block_height": row[0], "block_hash": row[7], "transactions": []})
+            block["transactions"].append(
+                {
+                    "block_height": row[0],
+                    "timestamp": row[1],
+                    "address": row[2],
+                    "recipient": row[3],
+                    "amount": row[4],
+                    "signature": row[5],
+                    "pubkey": row[6],
+                    "block_hash": row[7],
+                    "fee": row[8],
+                    "reward": row[9],
+                    "operation": row[10],
+                    "openfield": row[11],
+                }
+            )
+        return blocks
+
+    def get_block_from_hash_extra(self, block_hash):
+        """
+        The block itself, with its neighbours hashes and difficulty. {} if not found.
+        """
+        blocks = self.get_block_from_hash(block_hash)
+        if not blocks:
+            return {}
+        block = blocks[max(blocks)]
+        height = block["block_height"]
+        if self.indexed:
+            sql = "SELECT hash FROM idx.blocks WHERE height=?"
+        else:
+            sql = "SELECT block_hash FROM transactions WHERE block_height=? LIMIT 1"
+        previous = self.db.execute(sql, (height - 1,)).fetchone()
+        following = self.db.execute(sql, (height + 1,)).fetchone()
+        difficulty = self.db.execute("SELECT difficulty FROM misc WHERE block_height=?", (height,)).fetchone()
+        block["previous_block_hash"] = previous[0] if previous else ""
+        block["next_block_hash"] = following[0] if following else ""
+        block["difficulty"] = difficulty[0] if difficulty else -1
+        return block
+
+    def get_block_since(self, since):
+        """
+        Transaction rows of the blocks after since, at most the last BLOCKS_SINCE + 1 ones.
+        """
+        since = max(self._height() - BLOCKS_SINCE - 1, int(since))
+        return [list(row) for row in self.db.execute("SELECT * FROM transactions WHERE block_height>?", (since,))]
+
+    def get_address_since(self, since, minconf, address):
+        """
+        Transaction rows of the address after since, with minconf confirmations, ADDRESS_SINCE_BLOCKS blocks at most.
+        """
+        since, minconf = int(since), int(minconf)
+        last = min(self._height() - minconf, since + ADDRESS_SINCE_BLOCKS)
+        if self.indexed:
+            rows = self.db.execute(
+                "SELECT * FROM transactions WHERE rowid IN ("
+                "SELECT ledger_rowid FROM idx.tx WHERE address=? AND block_height>? AND block_height<=? UNION "
+                "SELECT ledger_rowid FROM idx.tx WHERE recipient=? AND block_height>? AND block_height<=?"
+                ") ORDER BY block_height, rowid",
+                (address, since, last, address, since, last),
+            )
+        else:
+            rows = self.db.execute(
+                "SELECT * FROM transactions WHERE block_height>? AND block_height<=? AND (address=? OR recipient=?) "
+                "ORDER BY block_height ASC",
+                (since, last, address, address),
+            )
+        return {"last": last, "minconf": minconf, "transactions": [list(row) for row in rows]}
+
+
+def open_ledger(bismuthpath, connection, index_path=None):
+    """
+    Ledger of the node in bismuthpath if it's there and readable, else the node connection itself.
+    """
+    path = ledger_path(bismuthpath)
+    if path is None:
+        return connection
+    try:
+        ledger = Ledger(path, connection, index_path or None)
+    except sqlite3.Error as e:
+        app_log.warning("Can't read the ledger {} ({}), using the node socket".format(path, e))
+        return connection
+    app_log.info("Reading the ledger {}".format(path))
+    return ledger
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
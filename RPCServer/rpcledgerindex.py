@@ -0,0 +1,178 @@
+"""
+Sidecar index of the node ledger, for the direct ledger reads (see rpcledger).
+
+The node schema is not ours to change, and may lack the indexes the rpc queries need. This sqlite file holds
+a slim copy of every ledger row - ledger rowid, height, addresses, amounts, txid - with covering indexes:
+- (address, block_height, amount, fee) and (recipient, block_height, amount, reward): balances are index only,
+  address history gives the ledger rowids,
+- txid: the ledger rowid of a transaction from a txid prefix,
+- block hash: height and rowid range of a block.
+Rows are then fetched from the ledger by rowid, which is always indexed.
+
+A single indexer - the primary worker - follows the ledger tip by rowid. The node appends rows in block order,
+and a rollback deletes the tail: when the last indexed row no longer matches, the index walks back to the last
+block still in the ledger, drops what follows, and goes on from there.
+
+@EggPool
+"""
+
+import sqlite3
+from logging import getLogger
+from time import time
+from urllib.parse import quote
+
+__version__ = "0.0.1"
+
+app_log = getLogger("tornado.application")
+
+# Ledger rows indexed per transaction
+BATCH = 10000
+
+# Deeper than that, a rollback - or a vacuum of the ledger, that renumbers rows - rebuilds the whole index
+MAX_ROLLBACK = 200
+
+SQL_CREATE = (
+    "CREATE TABLE IF NOT EXISTS tx (ledger_rowid INTEGER PRIMARY KEY, block_height INTEGER, address TEXT, "
+    "recipient TEXT, amount REAL, fee REAL, reward REAL, txid TEXT)",
+    "CREATE INDEX IF NOT EXISTS tx_address ON tx (address, block_height, amount, fee)",
+    "CREATE INDEX IF NOT EXISTS tx_recipient ON tx (recipient, block_height, amount, reward)",
+    "CREATE INDEX IF NOT EXISTS tx_txid ON tx (txid)",
+    "CREATE TABLE IF NOT EXISTS blocks (height INTEGER PRIMARY KEY, hash TEXT, first_rowid INTEGER, "
+    "last_rowid INTEGER)",
+    "CREATE INDEX IF NOT EXISTS blocks_hash ON blocks (hash, first_rowid, last_rowid)",
+    # Single row: last indexed ledger row, and its txid to detect rollbacks
+    "CREATE TABLE IF NOT EXISTS state (id INTEGER PRIMARY KEY CHECK (id = 0), last_rowid INTEGER, "
+    "last_txid TEXT, updated REAL)",
+    "INSERT OR IGNORE INTO state (id, last_rowid, last_txid, updated) VALUES (0, 0, '', 0)",
+)
+
+# Ledger rows to index, after a given rowid
+SQL_ROWS = (
+    "SELECT rowid, block_height, address, recipient, CAST(amount AS REAL), CAST(fee AS REAL), "
+    "CAST(reward AS REAL), SUBSTR(signature, 1, 56), block_hash FROM transactions WHERE rowid>? "
+    "ORDER BY rowid LIMIT ?"
+)
+
+
+def create(path):
+    """
+    Creates the sidecar file and its schema if needed. Safe from several processes.
+    """
+    db = sqlite3.connect(path, timeout=10, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    for sql in SQL_CREATE:
+        db.execute(sql)
+    db.close()
+
+
+def ledger_tip(db, prefix=""):
+    """
+    (rowid, txid) of the last ledger row, (0, "") if empty. prefix is the schema name of the ledger, if attached.
+    """
+    row = db.execute(
+        "SELECT rowid, SUBSTR(signature, 1, 56) FROM {}transactions ORDER BY rowid DESC LIMIT 1".format(prefix)
+    ).fetchone()
+    return tuple(row) if row else (0, "")
+
+
+class LedgerIndex:
+    """
+    Writer of the sidecar. Not thread safe: used by the indexer thread only.
+    """
+
+    __slots__ = ("path", "ledger", "db", "rebuilds", "rollbacks")
+
+    def __init__(self, path, ledger_path):
+        self.path = path
+        create(path)
+        self.db = sqlite3.connect(path, timeout=10)
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.ledger = sqlite3.connect("file:{}?mode=ro".format(quote(ledger_path)), uri=True, timeout=10)
+        self.rebuilds = 0
+        self.rollbacks = 0
+
+    def update(self) -> int:
+        """
+        Indexes the ledger rows added since the previous call, after a rollback if there was one.
+        Returns the number of rows indexed.
+        """
+        last_rowid, last_txid = self.db.execute("SELECT last_rowid, last_txid FROM state").fetchone()
+        if ledger_tip(self.ledger) == (last_rowid, last_txid):
+            return 0
+        if last_rowid:
+            row = self.ledger.execute(
+                "SELECT SUBSTR(signature, 1, 56) FROM transactions WHERE rowid=?", (last_rowid,)
+            ).fetchone()
+            if not row or row[0] != last_txid:
+                last_rowid = self._rollback()
+        done = 0
+        while True:
+            rows = self.ledger.execute(SQL_ROWS, (last_rowid, BATCH)).fetchall()
+            if not rows:
+                break
+            self._add(rows)
+            last_rowid = rows[-1][0]
+            done += len(rows)
+        return done
+
+    def _add(self, rows):
+        """
+        Indexes a batch of ledger rows, in one transaction.
+        """
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO tx (ledger_rowid, block_height, address, recipient, amount, fee, reward, txid) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (row[:8] for row in rows),
+            )
+            # Mirror rows have negative heights, they are not blocks
+            for rowid, height, *_, block_hash in rows:
+                if height > 0:
+                    self.db.execute(
+                        "INSERT INTO blocks (height, hash, first_rowid, last_rowid) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(height) DO UPDATE SET last_rowid=excluded.last_rowid",
+                        (height, block_hash, rowid, rowid),
+                    )
+            self.db.execute(
+                "UPDATE state SET last_rowid=?, last_txid=?, updated=?", (rows[-1][0], rows[-1][7], time())
+            )
+
+    def _rollback(self) -> int:
+        """
+        Drops the indexed blocks the ledger no longer has. Returns the last indexed rowid still valid.
+        """
+        blocks = self.db.execute(
+            "SELECT height, last_rowid FROM blocks ORDER BY height DESC LIMIT ?", (MAX_ROLLBACK,)
+        ).fetchall()
+        keep = None
+        for height, rowid in blocks:
+            txid = self.db.execute("SELECT txid FROM tx WHERE ledger_rowid=?", (rowid,)).fetchone()[0]
+            row = self.ledger.execute(
+                "SELECT SUBSTR(signature, 1, 56) FROM transactions WHERE rowid=?", (rowid,)
+            ).fetchone()
+            if row and row[0] == txid:
+                keep = (height, rowid, txid)
+                break
+        with self.db:
+            if keep is None:
+                self.rebuilds += 1
+                app_log.warning("Ledger index: no common block in the last {}, rebuilding".format(MAX_ROLLBACK))
+                self.db.execute("DELETE FROM tx")
+                self.db.execute("DELETE FROM blocks")
+                self.db.execute("UPDATE state SET last_rowid=0, last_txid='', updated=?", (time(),))
+                return 0
+            height, rowid, txid = keep
+            self.rollbacks += 1
+            app_log.warning("Ledger index: rollback to block {}".format(height))
+            self.db.execute("DELETE FROM tx WHERE ledger_rowid>?", (rowid,))
+            self.db.execute("DELETE FROM blocks WHERE height>?", (height,))
+            self.db.execute("UPDATE state SET last_rowid=?, last_txid=?, updated=?", (rowid, txid, time()))
+        return rowid
+
+    def close(self):
+        self.db.close()
+        self.ledger.close()
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
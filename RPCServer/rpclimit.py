@@ -0,0 +1,267 @@
+"""
+Client limits of the rpc server.
+
+- rpcallowip: only clients from localhost and the listed IPs/subnets are served.
+  Networks are compiled once to (version, network, mask) ints, the verdict is cached by IP.
+- Token bucket rate limits, per source IP (or subnet) and per rpc user.
+  A client can spend "burst" calls at once, then "rate" calls per sec. Buckets live in memory,
+  idle ones - full anyway - are dropped by a sweep that only runs when new clients come.
+  With several worker processes, buckets live in the shared sqlite file instead, so that
+  the limits hold whatever worker a call lands on.
+- A batch costs one token per call, a batch larger than the burst is refused at once: it would never pass.
+- Unix socket clients are not checked against rpcallowip, the socket file permissions do that.
+
+@EggPool
+"""
+
+import sqlite3
+import threading
+from ipaddress import ip_address, ip_network
+from math import ceil
+from time import monotonic
+
+from rpcsharedcache import connect
+
+__version__ = "0.0.3"
+
+# Always allowed
+LOCALHOST = ("127.0.0.0/8", "::1/128")
+
+# Rate limit key of the unix socket clients: all in the same ip bucket, as 127.0.0.1 is
+UNIX_CLIENT = "unix"
+
+# Max number of IPs in the verdict cache, it's cleared when full.
+KNOWN_IPS = 4096
+
+# Min interval between two sweeps of the idle buckets, sec
+SWEEP_INTERVAL = 60
+
+# Buckets shared by the worker processes. CLOCK_MONOTONIC is the same for all the processes.
+SQL_BUCKETS = ("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, stamp REAL)",)
+
+# Spends the tokens in one statement, only if they are there. Params: key, burst - cost, now, then
+# burst, rate, cost for the refill and the check.
+SQL_TAKE = (
+    "INSERT INTO buckets (key, tokens, stamp) VALUES (?1, ?2, ?3) ON CONFLICT(key) DO UPDATE SET "
+    "tokens = MIN(?4, tokens + (?3 - stamp) * ?5) - ?6, stamp = ?3 "
+    "WHERE MIN(?4, tokens + (?3 - stamp) * ?5) >= ?6"
+)
+
+
+class IPMatcher:
+    """
+    Precompiled list of allowed networks.
+    """
+
+    __slots__ = ("networks",)
+
+    def __init__(self, entries=()):
+        # (ip version, network address, netmask) as ints
+        self.networks = []
+        for entry in LOCALHOST + tuple(entries):
+            try:
+                # strict=False: 10.1.1.34/255.255.255.0 is the 10.1.1.0/24 network
+                network = ip_network(entry.strip(), strict=False)
+            except ValueError:
+                raise ValueError("Invalid rpcallowip entry '{}'".format(entry))
+            self.networks.append((network.version, int(network.network_address), int(network.netmask)))
+
+    def match(self, address) -> bool:
+        version, value = address.version, int(address)
+        for network_version, network, mask in self.networks:
+            if version == network_version and value & mask == network:
+                return True
+        return False
+
+
+class RateLimiter:
+    """
+    Token buckets by key. rate tokens per sec, up to burst. A rate of 0 means no limit.
+    db is an optional connection to the shared file of the workers, name then prefixes the keys.
+    """
+
+    __slots__ = ("rate", "burst", "buckets", "swept", "rejected", "db", "name", "lock")
+
+    def __init__(self, rate=0, burst=0, db=None, name=""):
+        self.rate = rate
+        self.burst = max(burst, rate, 1)
+        # key: [tokens, time of the last refill]
+        self.buckets = {}
+        self.swept = monotonic()
+        self.rejected = 0
+        self.db = db
+        self.name = name
+        self.lock = threading.Lock()
+
+    def check(self, cost):
+        """
+        Raises BatchTooLarge if cost is more than the bucket can ever hold.
+        """
+        if self.rate and cost > self.burst:
+            self.rejected += 1
+            raise BatchTooLarge(cost, self.burst, self.name)
+
+    def take(self, key, cost=1, now=None) -> float:
+        """
+        Spends cost tokens of the key. Returns 0 if they were there, else the sec to wait for them.
+        Raises BatchTooLarge if they can never be.
+        """
+        if not self.rate:
+            return 0
+        self.check(cost)
+        if now is None:
+            now = monotonic()
+        if self.db is not None:
+            return self._take_shared(key, cost, now)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [self.burst, now]
+            self._sweep(now)
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0
+        self.rejected += 1
+        return (cost - bucket[0]) / self.rate
+
+    def _take_shared(self, key, cost, now) -> float:
+        """
+        Same, in the shared file. A sqlite error lets the call pass: limits are no reason to fail calls.
+        """
+        key = "{}:{}".format(self.name, key)
+        try:
+            with self.lock:
+                taken = self.db.execute(
+                    SQL_TAKE, (key, self.burst - cost, now, self.burst, self.rate, cost)
+                ).rowcount
+                if taken:
+                    self._sweep(now)
+                    return 0
+                tokens, stamp = self.db.execute(
+                    "SELECT tokens, stamp FROM buckets WHERE key=?", (key,)
+                ).fetchone()
+        except sqlite3.Error:
+            return 0
+        self.rejected += 1
+        tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+        return max(cost - tokens, 0.001) / self.rate
+
+    def _sweep(self, now):
+        """
+        Drops the buckets that had time to refill: they are as good as new ones.
+        """
+        refill = self.burst / self.rate
+        if now - self.swept < max(SWEEP_INTERVAL, refill):
+            return
+        self.swept = now
+        if self.db is not None:
+            # Caller holds the lock
+            self.db.execute(
+                "DELETE FROM buckets WHERE key LIKE ? AND stamp<?", (self.name + ":%", now - refill)
+            )
+            return
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if now - bucket[1] < refill}
+
+    @property
+    def stats(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "clients": len(self.buckets), "rejected": self.rejected}
+
+
+class Limits:
+    """
+    rpcallowip check and rate limits of the rpc server, built once at startup.
+    shared is the path of the workers shared file, if any, where the buckets then live.
+    """
+
+    __slots__ = ("matcher", "known", "ipv4_shift", "ipv6_shift", "ips", "users")
+
+    def __init__(
+        self,
+        allowip=(),
+        ip_rate=0,
+        ip_burst=0,
+        user_rate=0,
+        user_burst=0,
+        ipv4_prefix=32,
+        ipv6_prefix=64,
+        shared=None,
+    ):
+        self.matcher = IPMatcher(allowip)
+        # remote ip: rate limit key of its subnet, or None if not allowed
+        self.known = {}
+        self.ipv4_shift = 32 - min(max(ipv4_prefix, 0), 32)
+        self.ipv6_shift = 128 - min(max(ipv6_prefix, 0), 128)
+        db = connect(shared) if shared and (ip_rate or user_rate) else None
+        self.ips = RateLimiter(ip_rate, ip_burst, db, "ip")
+        self.users = RateLimiter(user_rate, user_burst, db, "user")
+
+    def client(self, remote_ip):
+        """
+        Rate limit key of the client subnet, None if rpcallowip does not allow it.
+        """
+        try:
+            return self.known[remote_ip]
+        except KeyError:
+            pass
+        key = None
+        try:
+            address = ip_address(remote_ip)
+            if address.version == 6 and address.ipv4_mapped:
+                address = address.ipv4_mapped
+            if self.matcher.match(address):
+                shift = self.ipv4_shift if address.version == 4 else self.ipv6_shift
+                key = (address.version, int(address) >> shift)
+        except ValueError:
+            pass
+        if len(self.known) >= KNOWN_IPS:
+            self.known.clear()
+        self.known[remote_ip] = key
+        return key
+
+    def check_batch(self, size):
+        """
+        Raises BatchTooLarge if a batch of size calls is larger than one of the bursts.
+        """
+        self.ips.check(size)
+        self.users.check(size)
+
+    def take_ip(self, key, cost=1):
+        wait = self.ips.take(key, cost)
+        if wait:
+            raise RateLimited(wait, "ip")
+
+    def take_user(self, user, cost=1):
+        wait = self.users.take(user, cost)
+        if wait:
+            raise RateLimited(wait, "user")
+
+
+"""
+Custom exceptions
+"""
+
+
+class RateLimited(Exception):
+    code = -32005
+    message = "Rate limit exceeded, try again later"
+    data = None
+
+    def __init__(self, wait=1, limit=""):
+        super().__init__(wait)
+        # Whole seconds, as in a Retry-After header
+        self.data = {"limit": limit, "retry_after": max(1, ceil(wait))}
+
+
+class BatchTooLarge(RateLimited):
+    message = "Batch larger than the rate limit burst, split it"
+
+    def __init__(self, size=0, burst=0, limit=""):
+        super().__init__(limit=limit)
+        # No point retrying the same batch
+        self.data = {"limit": limit, "batch": size, "burst": burst}
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
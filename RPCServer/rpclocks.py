@@ -0,0 +1,97 @@
+"""
+Read/write locks for the wallet, so that calls on different accounts can run concurrently.
+
+@EggPool
+"""
+
+import threading
+from contextlib import contextmanager
+
+__version__ = "0.0.1"
+
+
+class RWLock:
+    """
+    Many readers or a single writer. Writers have priority: once a writer waits,
+    new readers wait too, so a busy account can't starve its writes.
+    Not reentrant.
+    """
+
+    __slots__ = ("cond", "readers", "writer", "waiting_writers")
+
+    def __init__(self):
+        self.cond = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        with self.cond:
+            while self.writer or self.waiting_writers:
+                self.cond.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.cond:
+            self.readers -= 1
+            if not self.readers:
+                self.cond.notify_all()
+
+    def acquire_write(self):
+        with self.cond:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.cond.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+
+    def release_write(self):
+        with self.cond:
+            self.writer = False
+            self.cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class LockManager:
+    """
+    One RWLock per name, created on first use.
+    """
+
+    __slots__ = ("locks", "lock")
+
+    def __init__(self):
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get(self, name) -> RWLock:
+        with self.lock:
+            rwlock = self.locks.get(name, None)
+            if rwlock is None:
+                rwlock = RWLock()
+                self.locks[name] = rwlock
+            return rwlock
+
+    def read(self, name):
+        return self.get(name).read()
+
+    def write(self, name):
+        return self.get(name).write()
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -0,0 +1,204 @@
+"""
+Push notifications of the websocket rpc clients.
+
+A single watcher - the node watcher thread - hands new blocks, new mempool transactions and
+the transactions of the watched addresses to the Hub, which fans them out to the subscriptions.
+Payloads are serialized once per event, not once per client.
+
+Every client has a bounded queue. A client that does not read fast enough loses its oldest
+notifications, and the next one it gets tells how many were dropped, so it knows to resync.
+
+@EggPool
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+from logging import getLogger
+
+from tornado.ioloop import IOLoop
+
+__version__ = "0.0.1"
+
+app_log = getLogger("tornado.application")
+
+# blocks: every new block. mempool: every new mempool transaction.
+# addresses: transactions, mempool and mined, of a list of addresses. wallet: same for all the addresses of the wallet.
+TOPICS = ("blocks", "mempool", "addresses", "wallet")
+
+# Default max number of pending notifications per client
+QUEUE_SIZE = 256
+
+NOTIFICATION = '{{"jsonrpc": "2.0", "method": "notify", "params": {{"subscription": "{}", "topic": "{}", "dropped": {}, "result": {}}}}}'
+
+
+class ClientQueue:
+    """
+    Bounded queue of the notifications of a client, the oldest ones go first when it's full.
+    Only used from the IOLoop.
+    """
+
+    __slots__ = ("items", "size", "dropped", "total_dropped", "ready")
+
+    def __init__(self, size=QUEUE_SIZE):
+        # (subscription id, topic, json payload)
+        self.items = deque()
+        self.size = size
+        # Dropped since the last get
+        self.dropped = 0
+        self.total_dropped = 0
+        self.ready = asyncio.Event()
+
+    def put(self, item):
+        if len(self.items) >= self.size:
+            self.items.popleft()
+            self.dropped += 1
+            self.total_dropped += 1
+        self.items.append(item)
+        self.ready.set()
+
+    async def get(self) -> str:
+        """
+        Next notification, as a json-rpc notification string.
+        """
+        while not self.items:
+            self.ready.clear()
+            await self.ready.wait()
+        subscription_id, topic, payload = self.items.popleft()
+        dropped, self.dropped = self.dropped, 0
+        return NOTIFICATION.format(subscription_id, topic, dropped, payload)
+
+
+class Subscription:
+
+    __slots__ = ("id", "queue", "topic", "addresses", "wallet")
+
+    def __init__(self, subscription_id, queue, topic, addresses=None, wallet=""):
+        self.id = subscription_id
+        self.queue = queue
+        self.topic = topic
+        self.addresses = addresses
+        self.wallet = wallet
+
+
+class Hub:
+    """
+    Subscriptions of the websocket clients. Built on the main thread, before the IOLoop starts.
+    Subscriptions change on the IOLoop only, the watcher thread reads them through wanted().
+    """
+
+    __slots__ = ("loop", "lock", "subscriptions", "next_id", "queue_size", "published")
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.loop = IOLoop.current()
+        self.lock = threading.Lock()
+        # id: Subscription
+        self.subscriptions = {}
+        self.next_id = 0
+        self.queue_size = queue_size
+        self.published = 0
+
+    def client(self) -> ClientQueue:
+        return ClientQueue(self.queue_size)
+
+    def subscribe(self, queue, topic, addresses=None, wallet="") -> str:
+        if topic not in TOPICS:
+            raise ValueError("Unknown topic {}, expected one of {}".format(topic, ", ".join(TOPICS)))
+        if topic == "addresses":
+            if not addresses or not isinstance(addresses, list):
+                raise ValueError("addresses topic needs a list of addresses")
+            addresses = frozenset(addresses)
+        else:
+            addresses = None
+        with self.lock:
+            self.next_id += 1
+            subscription_id = "{:x}".format(self.next_id)
+            self.subscriptions[subscription_id] = Subscription(subscription_id, queue, topic, addresses, wallet)
+        return subscription_id
+
+    def unsubscribe(self, subscription_id, queue) -> bool:
+        """
+        Only the client that subscribed can unsubscribe.
+        """
+        with self.lock:
+            subscription = self.subscriptions.get(subscription_id)
+            if subscription is None or subscription.queue is not queue:
+                return False
+            del self.subscriptions[subscription_id]
+        return True
+
+    def drop(self, queue):
+        """
+        Removes all the subscriptions of a closed client.
+        """
+        with self.lock:
+            self.subscriptions = {
+                subscription_id: subscription
+                for subscription_id, subscription in self.subscriptions.items()
+                if subscription.queue is not queue
+            }
+
+    def wanted(self):
+        """
+        What the watcher has to look for: (blocks, mempool, addresses, wallet names).
+        """
+        blocks, mempool, addresses, wallets = False, False, set(), set()
+        with self.lock:
+            for subscription in self.subscriptions.values():
+                if subscription.topic == "blocks":
+                    blocks = True
+                elif subscription.topic == "mempool":
+                    mempool = True
+                elif subscription.topic == "addresses":
+                    addresses.update(subscription.addresses)
+                else:
+                    wallets.add(subscription.wallet)
+        return blocks, mempool, addresses, wallets
+
+    def publish(self, blocks=(), mempool=(), activity=(), tracked=None):
+        """
+        Thread safe, called by the watcher. blocks and mempool are lists of dicts, activity a list of transaction
+        dicts with "address" and "recipient" keys. tracked is {wallet name: set of its addresses}.
+        """
+        if blocks or mempool or activity:
+            self.loop.add_callback(self._fan_out, blocks, mempool, activity, tracked or {})
+
+    def _fan_out(self, blocks, mempool, activity, tracked):
+        # Shared payloads, serialized once
+        shared = {
+            "blocks": [json.dumps(block) for block in blocks],
+            "mempool": [json.dumps(mempool)] if mempool else [],
+        }
+        for subscription in list(self.subscriptions.values()):
+            if subscription.topic in shared:
+                payloads = shared[subscription.topic]
+            else:
+                if subscription.topic == "addresses":
+                    addresses = subscription.addresses
+                else:
+                    addresses = tracked.get(subscription.wallet, ())
+                matching = [
+                    transaction
+                    for transaction in activity
+                    if transaction["address"] in addresses or transaction["recipient"] in addresses
+                ]
+                payloads = [json.dumps(matching)] if matching else []
+            for payload in payloads:
+                subscription.queue.put((subscription.id, subscription.topic, payload))
+                self.published += 1
+
+    @property
+    def stats(self) -> dict:
+        queues = {id(subscription.queue): subscription.queue for subscription in self.subscriptions.values()}
+        return {
+            "subscribers": len(queues),
+            "subscriptions": len(self.subscriptions),
+            "published": self.published,
+            "pending": sum(len(queue.items) for queue in queues.values()),
+            "dropped": sum(queue.total_dropped for queue in queues.values()),
+        }
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -0,0 +1,193 @@
+"""
+Registry of the json-rpc methods.
+
+Node methods are declared with the @rpc decorator, along with their params and defaults.
+The registry is built once at startup: dispatch is then a dict lookup, and params are
+checked and completed in a single step before the call, so methods always get all their args.
+
+@EggPool
+"""
+
+from copy import copy
+from inspect import iscoroutinefunction
+
+__version__ = "0.0.4"
+
+# Params clamped to a min value, wherever they appear
+CLAMPS = {"minconf": 1}
+
+
+class Signature:
+    """
+    Declared params of a rpc method: required ones, then optional ones with their default,
+    then an optional *name catching all remaining positional params.
+    """
+
+    __slots__ = ("names", "required", "tails", "varargs", "clamps", "coroutine")
+
+    def __init__(self, params, defaults, coroutine=True):
+        self.varargs = bool(params) and params[-1].startswith("*")
+        self.required = len(params) - self.varargs
+        self.names = tuple(params[: self.required]) + tuple(defaults.keys())
+        # Missing defaults, by number of optional params given
+        values = list(defaults.values())
+        self.tails = tuple(values[index:] for index in range(len(values) + 1))
+        self.clamps = tuple(
+            (index, CLAMPS[name]) for index, name in enumerate(self.names) if name in CLAMPS
+        )
+        self.coroutine = coroutine
+
+    def bind(self, params) -> list:
+        """
+        Positional args from the json-rpc params: a list, a dict by name, or None.
+        Raises InvalidParams if a required param is missing or an unknown one is given.
+        """
+        if params is None:
+            params = []
+        elif isinstance(params, dict):
+            params = self._from_dict(params)
+        elif not isinstance(params, list):
+            raise InvalidParams
+        given = len(params)
+        if given < self.required:
+            raise InvalidParams(
+                "Missing params, expected {}".format(", ".join(self.names[: self.required]))
+            )
+        if given <= len(self.names):
+            # Always a new list, the defaults are copied
+            args = params + self.tails[given - self.required]
+        elif self.varargs:
+            args = list(params)
+        else:
+            raise InvalidParams("Too many params, expected at most {}".format(len(self.names)))
+        for index, minimum in self.clamps:
+            value = args[index]
+            if type(value) is not int:
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise InvalidParams("{} has to be an integer".format(self.names[index]))
+            args[index] = value if value > minimum else minimum
+        return args
+
+    def _from_dict(self, params) -> list:
+        """
+        Named params to positional ones. Only trailing optional params can be left out.
+        """
+        unknown = set(params) - set(self.names)
+        if unknown:
+            raise InvalidParams("Unknown params {}".format(", ".join(sorted(unknown))))
+        args = []
+        for name in self.names:
+            if name not in params:
+                break
+            args.append(params[name])
+        if len(args) < len(params):
+            raise InvalidParams("Named params can't skip a param")
+        return args
+
+
+def rpc(*params, **defaults):
+    """
+    Declares a method as a json-rpc method.
+    @rpc("address", minconf=1) for a required address param and an optional minconf one, defaulting to 1.
+    @rpc("command", "*params") for a required command, then any number of params.
+    """
+
+    def decorator(func):
+        func.rpc_signature = Signature(params, defaults, iscoroutinefunction(func))
+        return func
+
+    return decorator
+
+
+def primary(func):
+    """
+    Declares a rpc method that only runs in the primary process, the one owning the wallets.
+    Goes right under @rpc. Other workers forward the calls.
+    """
+    func.rpc_primary = True
+    return func
+
+
+def _forwarded(forward, name):
+    async def method(request, *args):
+        return await forward(request, name, list(args))
+
+    return method
+
+
+class Registry:
+    """
+    Maps the rpc names to the bound methods of the interface, their signature and optional bulkhead.
+    Only the methods declared with @rpc are reachable.
+    """
+
+    __slots__ = ("methods",)
+
+    def __init__(self, interface, bulkheads=None, forward=None):
+        """
+        bulkheads is an optional {name: rpcadmission.Bulkhead}, limiting the concurrent calls of these methods.
+        forward is an optional coroutine (request, name, args): if given, the @primary methods are sent to it
+        once their params are bound, instead of running here.
+        """
+        bulkheads = bulkheads if bulkheads else {}
+        self.methods = {}
+        for name in dir(type(interface)):
+            func = getattr(type(interface), name)
+            signature = getattr(func, "rpc_signature", None)
+            if signature is None:
+                continue
+            method = getattr(interface, name)
+            if forward is not None and getattr(func, "rpc_primary", False):
+                method = _forwarded(forward, name)
+                signature = copy(signature)
+                signature.coroutine = True
+            self.methods[name] = (method, signature, bulkheads.pop(name, None))
+        if bulkheads:
+            raise ValueError("Bulkheads for unknown methods {}".format(", ".join(sorted(bulkheads))))
+
+    def with_methods(self, interface):
+        """
+        New registry with the @rpc methods of another interface on top of these ones.
+        """
+        registry = Registry.__new__(Registry)
+        registry.methods = dict(self.methods)
+        registry.methods.update(Registry(interface).methods)
+        return registry
+
+    def get(self, name):
+        """
+        (bound method, signature, bulkhead or None) or None if no such rpc method.
+        """
+        return self.methods.get(name)
+
+    @property
+    def bulkheads(self) -> dict:
+        """
+        Stats of the bulkheads, by method name.
+        """
+        return {
+            name: bulkhead.stats
+            for name, (method, signature, bulkhead) in self.methods.items()
+            if bulkhead is not None
+        }
+
+
+"""
+Custom exceptions
+"""
+
+
+class InvalidParams(Exception):
+    code = -32602
+    message = "Invalid params"
+    data = None
+
+    def __init__(self, data=None):
+        super().__init__(data)
+        self.data = data
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -0,0 +1,118 @@
+"""
+Background rescan of wallet addresses.
+
+Pages through the history of some addresses with api_getaddresssince, on dedicated node
+connections so the main one stays free for rpc calls, and stores what it finds in the
+wallet local history. Once done, the history is synced up to the last block all the addresses reached.
+
+@EggPool
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+
+from rpcconnections import Connection
+
+__version__ = "0.0.2"
+
+# Min confirmations asked to the node, the poller takes care of the most recent blocks.
+RESCAN_MINCONF = 1
+
+app_log = getLogger("tornado.application")
+
+
+class Rescan:
+    """
+    One rescan run. At most "workers" addresses are scanned at once, each worker with its own connection.
+    """
+
+    __slots__ = (
+        "ipport",
+        "history",
+        "job",
+        "workers",
+        "stop_event",
+        "verbose",
+        "local",
+        "connections",
+        "lock",
+    )
+
+    def __init__(self, ipport, history, job, workers=4, stop_event=None, verbose=False):
+        self.ipport = ipport
+        self.history = history
+        self.job = job
+        self.workers = max(1, workers)
+        self.stop_event = stop_event if stop_event else threading.Event()
+        self.verbose = verbose
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def start(self, addresses, since=0):
+        """
+        Runs the rescan in a background thread, returns at once. Progress is tracked by the job.
+        """
+        self.job.start()
+        thread = threading.Thread(target=self.run, args=(addresses, since), name="rescan")
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def run(self, addresses, since=0):
+        error = ""
+        try:
+            # Progress is counted in blocks, up to the current tip
+            tip = self._connection().command("statusjson")["blocks"]
+            self.job.set_total(len(addresses) * max(tip - since, 1))
+            with ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="rescan"
+            ) as pool:
+                reached = list(pool.map(self._scan, addresses, [since] * len(addresses)))
+            if reached and not self.stop_event.is_set():
+                self.history.synced(min(reached))
+        except Exception as e:
+            app_log.error("Rescan failed: {}".format(e))
+            error = e
+        finally:
+            with self.lock:
+                for connection in self.connections:
+                    connection.close()
+                self.connections = []
+        self.job.finish(error=error)
+
+    def _connection(self):
+        """
+        Dedicated connection of the current worker thread
+        """
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = Connection(self.ipport, verbose=self.verbose)
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def _scan(self, address, since):
+        """
+        Pages through the history of a single address, 720 blocks at a time.
+        Returns the last block height scanned.
+        """
+        connection = self._connection()
+        while not self.stop_event.is_set():
+            res = connection.command("api_getaddresssince", [since, RESCAN_MINCONF, address])
+            self.history.add(res["transactions"])
+            last = int(res["last"])
+            if last <= since:
+                # Caught up with the chain
+                break
+            self.job.advance(last - since)
+            since = last
+        if self.verbose:
+            app_log.info("Rescan of {} done up to {}".format(address, since))
+        return since
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
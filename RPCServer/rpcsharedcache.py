@@ -0,0 +1,155 @@
+"""
+Cache of rpc results by method and params, with a ttl.
+
+In memory for a single process. With several worker processes, a sqlite file in shared memory (/dev/shm)
+that all the workers read and write: a getinfo or a block fetched by a worker is served by all the others.
+It's a cache: any sqlite error is a miss, never a failed call.
+
+@EggPool
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from functools import wraps
+from time import time
+
+__version__ = "0.0.1"
+
+# Expired entries are purged every that many writes
+PURGE_EVERY = 1000
+
+SQL_CREATE = (
+    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL, value TEXT)",
+)
+
+
+def shared_dir() -> str:
+    """
+    Where to put files shared by the workers: memory backed if possible.
+    """
+    if os.path.isdir("/dev/shm"):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def connect(path):
+    """
+    Connection to a shared sqlite file: WAL so readers never wait, no fsync since it's all disposable.
+    """
+    db = sqlite3.connect(path, timeout=1, check_same_thread=False, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=OFF")
+    return db
+
+
+class SharedCache:
+    """
+    Key/value cache. path is the shared sqlite file, None for an in memory cache.
+    """
+
+    __slots__ = ("path", "db", "memory", "lock", "writes", "hits", "misses")
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        if path is None:
+            # key: (expires, value)
+            self.memory = {}
+            self.db = None
+        else:
+            self.memory = None
+            self.db = connect(path)
+
+    @staticmethod
+    def create(path, tables=()):
+        """
+        Creates a fresh shared file, before the workers are forked. tables are extra "CREATE TABLE" statements.
+        """
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        db = connect(path)
+        for sql in SQL_CREATE + tuple(tables):
+            db.execute(sql)
+        db.close()
+
+    def get(self, key):
+        """
+        Cached value, None if missing or expired.
+        """
+        now = time()
+        if self.db is None:
+            item = self.memory.get(key)
+            value = item[1] if item is not None and item[0] > now else None
+        else:
+            try:
+                with self.lock:
+                    row = self.db.execute(
+                        "SELECT value FROM cache WHERE key=? AND expires>?", (key, now)
+                    ).fetchone()
+                value = json.loads(row[0]) if row else None
+            except sqlite3.Error:
+                value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl):
+        now = time()
+        self.writes += 1
+        purge = self.writes % PURGE_EVERY == 0
+        if self.db is None:
+            self.memory[key] = (now + ttl, value)
+            if purge:
+                self.memory = {key: item for key, item in self.memory.items() if item[0] > now}
+            return
+        try:
+            with self.lock:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO cache (key, expires, value) VALUES (?, ?, ?)",
+                    (key, now + ttl, json.dumps(value)),
+                )
+                if purge:
+                    self.db.execute("DELETE FROM cache WHERE expires<?", (now,))
+        except sqlite3.Error:
+            pass
+
+    @property
+    def stats(self) -> dict:
+        return {"shared": self.db is not None, "hits": self.hits, "misses": self.misses, "writes": self.writes}
+
+
+def sharedcache(ttl=10):
+    """
+    Caches the result of a Node rpc method in node.cache, by params, for ttl sec.
+    args[0], the request, is not part of the key. Error results and None are not cached.
+    """
+
+    def decorator(func):
+        prefix = func.__name__ + ":"
+
+        @wraps(func)
+        async def inner(self, *args, **kwargs):
+            key = prefix + json.dumps(args[1:])
+            result = self.cache.get(key)
+            if result is None:
+                result = await func(self, *args, **kwargs)
+                if result is not None and not (isinstance(result, dict) and "error" in result):
+                    self.cache.set(key, result, ttl)
+            return result
+
+        return inner
+
+    return decorator
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
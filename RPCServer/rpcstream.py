@@ -0,0 +1,83 @@
+"""
+Streamed json-rpc results.
+
+A method can return a Stream, or a dict holding some, instead of a plain list: the handler then
+writes the response piece by piece with chunked transfer, and flushes every STREAM_CHUNK bytes.
+The serialized response never sits in memory as a whole, and the first bytes go out at once.
+
+@EggPool
+"""
+
+import json
+
+__version__ = "0.0.1"
+
+# Items serialized at once, by a single json.dumps
+STREAM_BATCH = 500
+
+# Bytes buffered before a flush to the client
+STREAM_CHUNK = 64 * 1024
+
+
+class Stream:
+    """
+    A json array produced item by item, from an iterable or an async iterable.
+    Generators can only be sent once: wrap a list if the result is cached.
+    """
+
+    __slots__ = ("items",)
+
+    def __init__(self, items):
+        self.items = items
+
+    async def __aiter__(self):
+        if hasattr(self.items, "__aiter__"):
+            async for item in self.items:
+                yield item
+        else:
+            for item in self.items:
+                yield item
+
+
+def has_stream(data) -> bool:
+    """
+    True if data is a Stream, or a dict with a Stream at any depth.
+    """
+    if isinstance(data, Stream):
+        return True
+    if isinstance(data, dict):
+        return any(has_stream(value) for value in data.values())
+    return False
+
+
+async def iter_json(data):
+    """
+    Async generator of the json text of data, where Streams become arrays serialized STREAM_BATCH items at a time.
+    Only dicts are walked to find Streams, anything else is serialized in one go.
+    """
+    if isinstance(data, Stream):
+        yield "["
+        batch = []
+        first = True
+        async for item in data:
+            batch.append(item)
+            if len(batch) >= STREAM_BATCH:
+                yield ("" if first else ",") + json.dumps(batch)[1:-1]
+                first = False
+                batch = []
+        if batch:
+            yield ("" if first else ",") + json.dumps(batch)[1:-1]
+        yield "]"
+    elif isinstance(data, dict) and has_stream(data):
+        yield "{"
+        for index, (key, value) in enumerate(data.items()):
+            yield "{}{}: ".format("," if index else "", json.dumps(str(key)))
+            async for chunk in iter_json(value):
+                yield chunk
+        yield "}"
+    else:
+        yield json.dumps(data)
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -0,0 +1,225 @@
+"""
+Pre-fork mode: several worker processes serve the same rpc port.
+
+Sockets are bound, then the workers forked. Worker 0 is the primary: the only one to load the wallets,
+poll the node and watch the chain. The others
+- forward the @primary (wallet) methods to it, over a private localhost port, with a random per run secret,
+- share a cache with it, in a sqlite file in shared memory (see rpcsharedcache),
+- share the rate limit buckets, in the same file (see rpclimit),
+- tell it what their websocket clients subscribed to, and get the watcher events back, through the same file.
+
+@EggPool
+"""
+
+import json
+import os
+import threading
+from logging import getLogger
+from time import time
+
+from tornado.httpclient import AsyncHTTPClient
+from tornado.netutil import bind_sockets
+from tornado.process import fork_processes
+
+from rpcauth import Auth, make_rpcauth
+from rpclimit import SQL_BUCKETS
+from rpcsharedcache import SharedCache, connect, shared_dir
+
+__version__ = "0.0.3"
+
+app_log = getLogger("tornado.application")
+
+# Auth user of the forwarded calls
+WORKER_USER = "__worker__"
+
+# Forwarded calls can be long ones (encryptwallet, importmulti...)
+FORWARD_TIMEOUT = 600
+
+# Watcher events older than that are purged, sec
+EVENTS_TTL = 60
+
+SQL_RELAY = (
+    "CREATE TABLE IF NOT EXISTS interest (worker INTEGER PRIMARY KEY, updated REAL, wanted TEXT)",
+    "CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, created REAL, event TEXT)",
+)
+
+
+class Workers:
+    """
+    What the workers share, set up before the fork. count 0 is one worker per core.
+    """
+
+    __slots__ = ("count", "index", "internal_sockets", "internal_port", "secret", "path")
+
+    def __init__(self, count, port):
+        self.count = count
+        self.index = 0
+        # Private port of the primary, picked by the OS
+        self.internal_sockets = bind_sockets(0, "127.0.0.1")
+        self.internal_port = self.internal_sockets[0].getsockname()[1]
+        self.secret = os.urandom(16).hex()
+        self.path = os.path.join(shared_dir(), "bismuthd-{}.db".format(port))
+        SharedCache.create(self.path, SQL_RELAY + SQL_BUCKETS)
+
+    def fork(self):
+        """
+        Forks the workers, returns in each of them. The parent process stays to restart the dead ones.
+        """
+        self.index = fork_processes(self.count)
+        if not self.primary:
+            for sock in self.internal_sockets:
+                sock.close()
+
+    @property
+    def primary(self) -> bool:
+        return self.index == 0
+
+    def auth(self) -> Auth:
+        """
+        Auth of the private port: only the workers.
+        """
+        return Auth(rpcauth=[make_rpcauth(WORKER_USER, self.secret)])
+
+    def forwarder(self):
+        return Forwarder(self.internal_port, self.secret)
+
+    def relay(self):
+        return Relay(self.path, self.index)
+
+
+class Forwarder:
+    """
+    Sends calls to the primary worker and returns their result.
+    """
+
+    __slots__ = ("url", "headers")
+
+    def __init__(self, port, secret):
+        self.url = "http://127.0.0.1:{}".format(port)
+        self.headers = {
+            "Authorization": Auth(WORKER_USER, secret).basic.decode("utf-8"),
+            "Content-Type": "application/json",
+        }
+
+    async def __call__(self, request, name, args):
+        wallet_name = getattr(request, "wallet_name", "")
+        url = self.url + ("/wallet/" + wallet_name if wallet_name else "/")
+        body = json.dumps({"jsonrpc": "2.0", "id": 1, "method": name, "params": args})
+        response = await AsyncHTTPClient().fetch(
+            url, method="POST", body=body, headers=self.headers, request_timeout=FORWARD_TIMEOUT, raise_error=False
+        )
+        if response.code != 200:
+            raise PrimaryUnavailable({"status": response.code})
+        answer = json.loads(response.body)
+        if answer.get("error"):
+            raise ForwardedError(answer["error"])
+        return answer.get("result")
+
+
+class Relay:
+    """
+    Websocket subscriptions across the workers. Secondaries post what they want and read the events,
+    the primary reads what they want and posts the events. Each is used by a single thread.
+    """
+
+    __slots__ = ("worker", "db", "lock", "seq")
+
+    def __init__(self, path, worker):
+        self.worker = worker
+        self.db = connect(path)
+        self.lock = threading.Lock()
+        with self.lock:
+            row = self.db.execute("SELECT MAX(seq) FROM events").fetchone()
+        # Only the events to come
+        self.seq = row[0] or 0
+
+    def post_interest(self, wanted):
+        blocks, mempool, addresses, wallets = wanted
+        data = json.dumps([blocks, mempool, sorted(addresses), sorted(wallets)])
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO interest (worker, updated, wanted) VALUES (?, ?, ?)",
+                (self.worker, time(), data),
+            )
+
+    def interests(self, wanted, max_age):
+        """
+        wanted, merged with what the other workers asked for in the last max_age sec.
+        """
+        blocks, mempool, addresses, wallets = wanted
+        addresses, wallets = set(addresses), set(wallets)
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT wanted FROM interest WHERE worker!=? AND updated>?", (self.worker, time() - max_age)
+            ).fetchall()
+        for (data,) in rows:
+            other_blocks, other_mempool, other_addresses, other_wallets = json.loads(data)
+            blocks = blocks or other_blocks
+            mempool = mempool or other_mempool
+            addresses.update(other_addresses)
+            wallets.update(other_wallets)
+        return blocks, mempool, addresses, wallets
+
+    def post_event(self, blocks, mempool, activity, tracked):
+        """
+        tracked is {wallet name: addresses of the wallet}, only the ones in activity are sent.
+        """
+        if not (blocks or mempool or activity):
+            return
+        touched = {entry["address"] for entry in activity} | {entry["recipient"] for entry in activity}
+        tracked = {name: sorted(addresses & touched) for name, addresses in tracked.items()}
+        now = time()
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO events (created, event) VALUES (?, ?)",
+                (now, json.dumps([blocks, mempool, activity, tracked])),
+            )
+            self.db.execute("DELETE FROM events WHERE created<?", (now - EVENTS_TTL,))
+
+    def events(self) -> list:
+        """
+        Events posted since the previous call, as (blocks, mempool, activity, tracked).
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT seq, event FROM events WHERE seq>? ORDER BY seq", (self.seq,)).fetchall()
+        events = []
+        for seq, data in rows:
+            blocks, mempool, activity, tracked = json.loads(data)
+            events.append((blocks, mempool, activity, {name: set(addresses) for name, addresses in tracked.items()}))
+            self.seq = seq
+        return events
+
+
+"""
+Custom exceptions
+"""
+
+
+class ForwardedError(Exception):
+    """
+    Error answered by the primary, passed on as is.
+    """
+
+    code = -32603
+    message = "Internal error"
+    data = None
+
+    def __init__(self, error):
+        super().__init__(error)
+        self.code = error.get("code", self.code)
+        self.message = error.get("message", self.message)
+        self.data = error.get("data")
+
+
+class PrimaryUnavailable(Exception):
+    code = -33302
+    message = "Wallet process unavailable, try again later"
+    data = None
+
+    def __init__(self, data=None):
+        super().__init__(data)
+        self.data = data
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -8,15 +8,19 @@ https://github.com/Pavel-Egorov/tornado_jsonrpc/blob/master/LICENSE
 This file has been modified by @EggPool, the licence of the modified file is kept under apache licence.
 """
 
+import asyncio
 import json
 # import sys, os
-from copy import deepcopy
 from logging import getLogger
+from socket import AF_UNIX
 from sys import exc_info
 
-from base64 import b64decode
-
 from tornado.web import RequestHandler
+from tornado.websocket import WebSocketClosedError, WebSocketHandler
+
+from rpclimit import UNIX_CLIENT, RateLimited
+from rpcregistry import InvalidParams, rpc  # raised by the registry when binding params
+from rpcstream import STREAM_CHUNK, has_stream, iter_json
 
 MAX_ERROR_MESSAGE_LENGTH = 200
 
@@ -24,45 +28,110 @@ MAX_ERROR_MESSAGE_LENGTH = 200
 PROTOCOL_VERSIONS = ('2.0',)
 
 
-# TODO: Handle proper auth
-
 app_log = getLogger("tornado.application")
 
 
-class JSONRPCHandler(RequestHandler):
-    def set_default_headers(self):
-        self.set_header('Content-Type', 'application/json')
+class RPCAccessMixin:
+    """
+    rpcallowip, rate limits and auth of the http and websocket handlers, checked before any call.
+    """
 
-    def set_extra_headers(self, path=''):
-        self.set_header('Cache-Control', 'no-store')
-
-    def initialize(self, interface):
+    def initialize(self, interface, registry, auth, limits):
         self.interface = interface
-
-    async def get(self):
-        self.write("'JSON-RPC server handles only POST requests'")
+        # rpcregistry.Registry of the interface, built once at startup
+        self.registry = registry
+        # rpcauth.Auth, built once at startup
+        self.auth = auth
+        # rpclimit.Limits, built once at startup
+        self.limits = limits
 
     async def prepare(self):
+        context = getattr(self.request.connection, "context", None)
+        if getattr(context, "address_family", None) == AF_UNIX:
+            # rpcunixsocket: its file permissions let the client in
+            self.client = UNIX_CLIENT
+        else:
+            # Rate limit key of the client subnet, None if not in rpcallowip
+            self.client = self.limits.client(self.request.remote_ip)
+        if self.client is None:
+            app_log.warning("Connection refused from {}, see rpcallowip".format(self.request.remote_ip))
+            self.set_status(403)
+            self.finish()
+            return
+        # Before the auth, so a flood of bad credentials is throttled too
+        try:
+            self.limits.take_ip(self.client)
+        except RateLimited as exception:
+            self._write_limited(exception)
+            self.finish()
+            return
         auth_header = self.request.headers.get("Authorization", "")
-        # print("auth_header", auth_header)
         if not auth_header.startswith("Basic "):
             self.set_status(401)
-            # self.write("'Auth required {}'".format(auth_header))
+            self.set_header("WWW-Authenticate", 'Basic realm="jsonrpc"')
             self.finish()
-        auth_decoded = b64decode(auth_header[6:]).decode('ascii')
-        username, password = str(auth_decoded).split(':', 1)
-        # print(username, password)
-        if (username, password) != (self.interface.config.rpcuser, self.interface.config.rpcpassword):
-            print("Auth failed")
+            return
+        # The stream is the same for all the requests of a keep-alive connection
+        self.rpc_user = self.auth.check(auth_header, getattr(self.request.connection, "stream", None))
+        if not self.rpc_user:
+            app_log.warning("Auth failed from {}".format(self.request.remote_ip))
             self.set_status(403)
-            # self.write("'Auth Failed'")
             self.finish()
+            return
+        try:
+            self.limits.take_user(self.rpc_user)
+        except RateLimited as exception:
+            self._write_limited(exception)
+            self.finish()
+            return
+
+    def _take(self, cost):
+        """
+        Takes the tokens of more calls from the client buckets. Raises RateLimited.
+        """
+        self.limits.take_ip(self.client, cost)
+        self.limits.take_user(self.rpc_user, cost)
+
+    def _write_json(self, response):
+        """
+        Serializes the response, once, and writes it. Results are never copied.
+        """
+        payload = json.dumps(response)
+        if self.interface.config.verbose:
+            app_log.info("response {}".format(payload))
+        self.write(payload)
+
+    def _write_limited(self, exception):
+        """
+        429 answer, with a json-rpc error telling the seconds to wait - if waiting can help.
+        """
+        self.set_status(429)
+        if "retry_after" in exception.data:
+            self.set_header("Retry-After", str(exception.data["retry_after"]))
+        self._write_json({'id': None, 'result': None, 'error': _get_error(exception)})
+
+
+class JSONRPCHandler(RPCAccessMixin, RequestHandler):
+    def set_default_headers(self):
+        self.set_header('Content-Type', 'application/json')
+
+    def set_extra_headers(self, path=''):
+        self.set_header('Cache-Control', 'no-store')
+
+    async def get(self):
+        self.write("'JSON-RPC server handles only POST requests'")
 
     async def post(self, *args, **kwargs):
+        # /wallet/<name> routes the calls to a loaded wallet, "/" to the default one.
+        self.wallet_name = args[0] if args else ""
+        if self.wallet_name not in self.interface.wallets:
+            self._write_json({'id': None, 'result': None, 'error': _get_error(WalletNotFound())})
+            return
         try:
-            request_body = json.loads(self.request.body.decode())
+            body = self.request.body.decode()
+            request_body = json.loads(body)
             if self.interface.config.verbose > 1:
-                app_log.info("request_body {}", self.request.body.decode())
+                app_log.info("request_body {}".format(body))
             if not request_body:
                 raise InvalidJSON
 
@@ -72,13 +141,24 @@ class JSONRPCHandler(RequestHandler):
             if not (is_dict or is_list):
                 raise InvalidJSON
         except (UnicodeDecodeError, json.JSONDecodeError) as exception:
-            self.write({'id': None, 'result': None, 'error': _get_error(exception)})
+            self._write_json({'id': None, 'result': None, 'error': _get_error(exception)})
             return
 
+        # A batch costs one token per call, the first one was taken by prepare()
+        if is_list and len(request_body) > 1:
+            try:
+                self.limits.check_batch(len(request_body))
+                self._take(len(request_body) - 1)
+            except RateLimited as exception:
+                self._write_limited(exception)
+                return
+
         if is_dict:
             response = await _get_response(self, self.interface, request_body)
-            if response:
-                self.write(response)
+            if response and has_stream(response):
+                await self._stream_json([response])
+            elif response:
+                self._write_json(response)
         elif is_list:
             responses = []
 
@@ -87,8 +167,142 @@ class JSONRPCHandler(RequestHandler):
                 if response:
                     responses.append(response)
 
+            if any(has_stream(response) for response in responses):
+                await self._stream_json(responses, batch=True)
+            elif responses:
+                self._write_json(responses)
+
+    async def _stream_json(self, responses, batch=False):
+        """
+        Writes the responses holding Streams piece by piece, flushing every STREAM_CHUNK bytes.
+        Since the first flush sends the headers, tornado switches to chunked transfer.
+        An error past that point can only close the connection.
+        """
+        size = 0
+        if batch:
+            self.write("[")
+        for index, response in enumerate(responses):
+            if index:
+                self.write(",")
+            async for chunk in iter_json(response):
+                self.write(chunk)
+                size += len(chunk)
+                if size >= STREAM_CHUNK:
+                    await self.flush()
+                    size = 0
+        if batch:
+            self.write("]")
+        if self.interface.config.verbose:
+            app_log.info("streamed {} response(s)".format(len(responses)))
+
+
+class JSONRPCWebSocketHandler(RPCAccessMixin, WebSocketHandler):
+    """
+    Same calls as JSONRPCHandler over a persistent websocket, one json-rpc request or batch per message,
+    plus subscribe/unsubscribe to get notified of new blocks, mempool transactions, addresses or wallet activity.
+    """
+
+    def initialize(self, interface, registry, auth, limits, hub):
+        super().initialize(interface, registry, auth, limits)
+        # rpcnotify.Hub, fed by the node watcher
+        self.hub = hub
+        self.queue = None
+        self.sender = None
+
+    def open(self, *args, **kwargs):
+        # /wallet/<name>/ws for a loaded wallet, /ws for the default one.
+        self.wallet_name = args[0] if args else ""
+        if self.wallet_name not in self.interface.wallets:
+            self.close(4018, WalletNotFound.message)
+            return
+        # subscribe and unsubscribe on top of the interface methods
+        self.registry = self.registry.with_methods(self)
+        self.queue = self.hub.client()
+        self.sender = asyncio.ensure_future(self._send_notifications())
+
+    def on_close(self):
+        if self.queue is not None:
+            self.hub.drop(self.queue)
+        if self.sender is not None:
+            self.sender.cancel()
+
+    async def on_message(self, message):
+        # Messages are handled in order, the next one is read once this one is answered.
+        try:
+            request_body = json.loads(message)
+            if not request_body or not isinstance(request_body, (dict, list)):
+                raise InvalidJSON
+        except (json.JSONDecodeError, InvalidJSON) as exception:
+            await self._send({'id': None, 'result': None, 'error': _get_error(exception)})
+            return
+        is_list = isinstance(request_body, list)
+        try:
+            self._take(len(request_body) if is_list else 1)
+        except RateLimited as exception:
+            await self._send({'id': None, 'result': None, 'error': _get_error(exception)})
+            return
+        if is_list:
+            responses = []
+            for i in request_body:
+                response = await _get_response(self, self.interface, i)
+                if response:
+                    responses.append(response)
             if responses:
-                self.write(json.dumps(responses).encode())
+                await self._send(responses)
+        else:
+            response = await _get_response(self, self.interface, request_body)
+            if response:
+                await self._send(response)
+
+    async def _send(self, response):
+        """
+        One message per response or batch. Streams are serialized piece by piece, yet sent whole.
+        """
+        batch = isinstance(response, list)
+        responses = response if batch else [response]
+        if any(has_stream(item) for item in responses):
+            parts = []
+            for item in responses:
+                parts.append("".join([chunk async for chunk in iter_json(item)]))
+            payload = "[{}]".format(",".join(parts)) if batch else parts[0]
+        else:
+            payload = json.dumps(response)
+        if self.interface.config.verbose:
+            app_log.info("ws response {}".format(payload[:MAX_ERROR_MESSAGE_LENGTH]))
+        try:
+            await self.write_message(payload)
+        except WebSocketClosedError:
+            pass
+
+    async def _send_notifications(self):
+        """
+        Writes the notifications one at a time, waiting for each one to be flushed: a slow client fills its
+        bounded queue instead of the server memory.
+        """
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.write_message(message)
+            except WebSocketClosedError:
+                return
+
+    @rpc("topic", addresses=None)
+    async def subscribe(self, *args, **kwargs):
+        """
+        (topic, addresses)  -  topic is blocks, mempool, addresses (with a list of addresses) or wallet.
+        Returns the subscription id, found in the "notify" notifications.
+        """
+        try:
+            return self.hub.subscribe(self.queue, args[1], args[2], self.wallet_name)
+        except ValueError as e:
+            raise InvalidParams(str(e))
+
+    @rpc("subscription")
+    async def unsubscribe(self, *args, **kwargs):
+        """
+        (subscription)  -  True if the subscription was there.
+        """
+        return self.hub.unsubscribe(args[1], self.queue)
 
 
 class CORSIgnoreJSONRPCHandler(JSONRPCHandler):
@@ -125,9 +339,7 @@ async def _get_response(request, interface, request_body):
         version = _get_version(request_body)
         if interface.config.verbose:
             app_log.info("request_id {} version {}".format(request_id, version))
-        result = await _get_result(request, _get_method(interface, request_body), request_body.get('params'))
-        if interface.config.verbose:
-            app_log.info("result {}".format(json.dumps(result)))
+        result = await _get_result(request, _get_method(request.registry, request_body), request_body.get('params'))
     except Exception as exception:
         if interface.config.verbose:
             app_log.warning("Exception {}".format(exception))
@@ -137,10 +349,8 @@ async def _get_response(request, interface, request_body):
         return _get_with_protocol_version({'id': request_id, 'result': result, 'error': None}, version)
 
 
-def _get_method(interface, request_body):
-    if interface.config.verbose > 1:
-        app_log.info("Looking for method {}".format(request_body.get('method', '')))
-    method = getattr(interface, request_body.get('method', ''), None)
+def _get_method(registry, request_body):
+    method = registry.get(request_body.get('method', ''))
     if not method:
         raise MethodNotFound
     return method
@@ -154,22 +364,26 @@ def _get_version(request_body):
 
 
 async def _get_result(request, method, params):
-    if params is None:
-        return await method(request)
+    method, signature, bulkhead = method
+    args = signature.bind(params)
+    if bulkhead is None:
+        return await _call(request, method, signature, args)
+    # Raises rpcadmission.ServerBusy if the method is saturated
+    async with bulkhead:
+        return await _call(request, method, signature, args)
 
-    elif isinstance(params, list):
-        return await method(request, *params)
 
-    elif isinstance(params, dict):
-        return await method(request, **params)
-    raise InvalidParams
+async def _call(request, method, signature, args):
+    if signature.coroutine:
+        return await method(request, *args)
+    return method(request, *args)
 
 
 def _get_with_protocol_version(response, version):
-    updated_response = deepcopy(response)
+    # response is a fresh dict around the result, no need for a copy
     if version:
-        updated_response['jsonrpc'] = version
-    return updated_response
+        response['jsonrpc'] = version
+    return response
 
 
 class InvalidVersion(Exception):
@@ -184,9 +398,9 @@ class MethodNotFound(Exception):
     data = None
 
 
-class InvalidParams(Exception):
-    code = -32602
-    message = 'Invalid params'
+class WalletNotFound(Exception):
+    code = -18
+    message = 'Requested wallet does not exist or is not loaded'
     data = None
 
 
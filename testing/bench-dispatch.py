@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the json-rpc dispatch: per call overhead of the method lookup and params handling,
+getattr and hand parsing versus the rpcregistry dict lookup and signature binding.
+Runs locally on a dummy interface, no server nor node needed.
+
+python3 bench-dispatch.py [calls]
+"""
+
+import asyncio
+import sys
+import time
+
+sys.path.append("../RPCServer")
+
+import tornado_jsonrpc
+from rpcregistry import Registry, rpc
+
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+
+class Config:
+    verbose = 0
+
+
+class Interface:
+    """Same method, hand parsed or declared."""
+
+    config = Config()
+
+    async def getbalance_hand(self, *args, **kwargs):
+        minconf = 1
+        if len(args) > 2:
+            minconf = args[2]
+        if minconf < 1:
+            minconf = 1
+        account = args[1] if len(args) > 1 else ""
+        return account, minconf
+
+    @rpc(account="", minconf=1)
+    async def getbalance(self, *args, **kwargs):
+        account, minconf = args[1:3]
+        return account, minconf
+
+
+class Handler:
+    """Stands for the tornado request handler."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+
+async def bench():
+    interface = Interface()
+    registry = Registry(interface)
+    handler = Handler(registry)
+    params = ["bench", 0]
+
+    start = time.perf_counter()
+    for i in range(CALLS):
+        method = getattr(interface, "getbalance_hand", None)
+        await method(handler, *params)
+    hand = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(CALLS):
+        method, signature, bulkhead = registry.get("getbalance")
+        await method(handler, *signature.bind(params))
+    declared = time.perf_counter() - start
+
+    body = {"jsonrpc": "2.0", "id": 1, "method": "getbalance", "params": params}
+    start = time.perf_counter()
+    for i in range(CALLS):
+        await tornado_jsonrpc._get_response(handler, interface, body)
+    full = time.perf_counter() - start
+
+    print("{} calls".format(CALLS))
+    print("getattr + hand parsing   {:0.2f} us/call".format(hand * 1e6 / CALLS))
+    print("registry + bind          {:0.2f} us/call".format(declared * 1e6 / CALLS))
+    print("full _get_response       {:0.2f} us/call".format(full * 1e6 / CALLS))
+
+
+asyncio.get_event_loop().run_until_complete(bench())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the rpc HTTP server settings: bytes on the wire with and without gzip,
+requests/sec with a new connection per call ("Connection: close") versus a persistent one.
+Runs a local server on a dummy interface with the bismuthd app and server settings, no node needed.
+
+python3 bench-http.py [calls] [rows]
+"""
+
+import http.client
+import json
+import multiprocessing
+import sys
+import time
+from base64 import b64encode
+
+sys.path.append("../RPCServer")
+
+from tornado.ioloop import IOLoop
+
+from bismuthd import make_app, server_settings
+from rpcnotify import Hub
+from rpcregistry import Registry, rpc
+
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+ROWS = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+PORT = 18115
+
+
+class Config:
+    verbose = 0
+    rpcuser = "username"
+    rpcpassword = "password"
+    rpcauth = []
+    rpccompress = 1
+    rpccompressmin = 1024
+    rpccompresslevel = 6
+    rpcnokeepalive = 0
+    rpcidletimeout = 300
+    rpcclienttimeout = 30
+    rpcmaxbody = 10 * 1024 * 1024
+    rpcmaxbuffer = 10 * 1024 * 1024
+    rpcallowip = []
+    rpciprate = 0
+    rpcipburst = 0
+    rpcuserrate = 0
+    rpcuserburst = 0
+    rpcipv4prefix = 32
+    rpcipv6prefix = 64
+
+
+class Interface:
+    config = Config()
+    wallets = {"": None}
+
+    def __init__(self):
+        self.hub = Hub()
+
+    @rpc()
+    async def getblockcount(self, *args, **kwargs):
+        return 1000000
+
+    @rpc()
+    async def listreceivedbyaddress(self, *args, **kwargs):
+        return [
+            {"address": "{:056x}".format(i), "account": "acc{}".format(i % 10), "amount": 1.5, "confirmations": 12}
+            for i in range(ROWS)
+        ]
+
+
+def serve():
+    interface = Interface()
+    make_app(interface, Registry(interface), interface.config).listen(
+        PORT, address="127.0.0.1", **server_settings(interface.config)
+    )
+    IOLoop.current().start()
+
+
+HEADERS = {
+    "Authorization": "Basic " + b64encode(b"username:password").decode(),
+    "Content-Type": "application/json",
+}
+
+
+def run(method, keep_alive, gzip):
+    headers = dict(HEADERS)
+    if gzip:
+        headers["Accept-Encoding"] = "gzip"
+    if not keep_alive:
+        headers["Connection"] = "close"
+    body = json.dumps({"jsonrpc": "2.0", "id": 1, "method": method})
+    connection = None
+    wire = 0
+    start = time.perf_counter()
+    for i in range(CALLS):
+        if connection is None:
+            connection = http.client.HTTPConnection("127.0.0.1", PORT)
+        connection.request("POST", "/", body, headers)
+        response = connection.getresponse()
+        # http.client does not decompress: this is what went on the wire.
+        wire += len(response.read())
+        if not keep_alive:
+            connection.close()
+            connection = None
+    elapsed = time.perf_counter() - start
+    print(
+        "{:22} keep-alive={:d} gzip={:d}  {:7.0f} req/s  {:8.0f} bytes/answer".format(
+            method, keep_alive, gzip, CALLS / elapsed, wire / CALLS
+        )
+    )
+
+
+if __name__ == "__main__":
+    server = multiprocessing.Process(target=serve, daemon=True)
+    server.start()
+    time.sleep(1)
+    try:
+        for method in ("getblockcount", "listreceivedbyaddress"):
+            for keep_alive, gzip in ((False, False), (True, False), (True, True)):
+                run(method, keep_alive, gzip)
+    finally:
+        server.terminate()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of key generation and signature throughput per key type.
+Runs locally against rpckeys, no server needed.
+
+python3 bench-keytypes.py [keygen_count] [sign_count]
+"""
+
+import sys
+import time
+
+sys.path.append("../RPCServer")
+
+from polysign.signerfactory import SignerFactory
+
+from rpckeys import KEY_TYPES, Key
+
+KEYGEN_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+SIGN_COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+# Same shape as a real tx signed part: (timestamp, address, recipient, amount, operation, openfield)
+SIGNED_PART = ("1564555206.00", "", "f6c0363ca1c5aa28cc584252e65a63998493ff0a5ec1bb16beda9bac",
+               "1.00000000", "0", "bench")
+
+print("{:<8} {:>12} {:>12}".format("type", "keygen/s", "sign/s"))
+for key_type in KEY_TYPES:
+    start = time.time()
+    for i in range(KEYGEN_COUNT):
+        key = Key(key_type=key_type)
+        key.generate()
+    keygen_rate = KEYGEN_COUNT / (time.time() - start)
+
+    signed_part = (SIGNED_PART[0], key.address) + SIGNED_PART[2:]
+    # First signature parses the key, not part of the measure.
+    signature = key.sign(signed_part, base64_output=True).decode("utf-8")
+    SignerFactory.verify_bis_signature(
+        signature, key.hashed_pubkey, str(signed_part).encode("utf-8"), key.address
+    )
+    start = time.time()
+    for i in range(SIGN_COUNT):
+        key.sign(signed_part, base64_output=True)
+    sign_rate = SIGN_COUNT / (time.time() - start)
+
+    print("{:<8} {:>12.1f} {:>12.1f}".format(key_type, keygen_rate, sign_rate))
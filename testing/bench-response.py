@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the json-rpc response path on large payloads:
+former one (deepcopy of the response, json.dumps of the result for the verbose log, then tornado json_encode)
+versus the current one (response serialized once, and that same string logged).
+Runs locally on synthetic payloads, no server nor node needed.
+
+python3 bench-response.py [rounds]
+"""
+
+import json
+import sys
+import time
+from copy import deepcopy
+
+from tornado.escape import json_encode
+
+sys.path.append("../RPCServer")
+
+import tornado_jsonrpc
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+
+def block(transactions):
+    """Looks like a getblock verbosity 2 answer."""
+    return {
+        "hash": "a" * 56,
+        "height": 1000000,
+        "tx": [
+            {
+                "txid": "{:056d}".format(i),
+                "address": "b" * 56,
+                "recipient": "c" * 56,
+                "amount": 12.5,
+                "fee": 0.01,
+                "openfield": "some data {}".format(i),
+                "confirmations": 10,
+            }
+            for i in range(transactions)
+        ],
+    }
+
+
+def received(addresses):
+    """Looks like a listreceivedbyaddress answer."""
+    return [
+        {"address": "{:056d}".format(i), "account": "acc{}".format(i % 100), "amount": 1.5, "confirmations": 12}
+        for i in range(addresses)
+    ]
+
+
+def before(result, verbose):
+    """Response path before the change."""
+    if verbose:
+        json.dumps(result)
+    response = deepcopy({"id": 1, "result": result, "error": None})
+    response["jsonrpc"] = "2.0"
+    return json_encode(response)
+
+
+def after(result, verbose):
+    """Current response path."""
+    response = tornado_jsonrpc._get_with_protocol_version({"id": 1, "result": result, "error": None}, "2.0")
+    payload = json.dumps(response)
+    if verbose:
+        "response {}".format(payload)
+    return payload
+
+
+for name, result in (("getblock 5000 tx", block(5000)), ("listreceivedbyaddress 20000", received(20000))):
+    for verbose in (0, 1):
+        timings = []
+        for path in (before, after):
+            start = time.perf_counter()
+            for i in range(ROUNDS):
+                payload = path(result, verbose)
+            timings.append((time.perf_counter() - start) * 1000 / ROUNDS)
+        print(
+            "{:28} verbose={} {:6.0f} KB  before {:7.2f} ms  after {:7.2f} ms  x{:0.1f}".format(
+                name, verbose, len(payload) / 1024, timings[0], timings[1], timings[0] / timings[1]
+            )
+        )
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Peak memory and time to first byte of a large response, serialized as a whole versus streamed.
+Runs locally on a synthetic getblocksince answer, no server nor node needed.
+
+python3 bench-stream.py [rows]
+"""
+
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+
+sys.path.append("../RPCServer")
+
+from rpcstream import STREAM_CHUNK, Stream, iter_json
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+rows = [
+    [i, 1500000000.12, "a" * 56, "b" * 56, "1.00000000", "s" * 684, "p" * 100, "h" * 56, "0.01", "0", "", "data"]
+    for i in range(ROWS)
+]
+
+
+def whole():
+    tracemalloc.start()
+    start = time.perf_counter()
+    payload = json.dumps({"id": 1, "result": rows, "error": None, "jsonrpc": "2.0"})
+    first = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return len(payload), first, time.perf_counter() - start, peak
+
+
+async def streamed():
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    size = total = 0
+    buffer = []
+    async for chunk in iter_json({"id": 1, "result": Stream(rows), "error": None, "jsonrpc": "2.0"}):
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= STREAM_CHUNK:
+            # Stands for write + flush: the chunk is handed to the socket and released.
+            if first is None:
+                first = time.perf_counter() - start
+            total += size
+            buffer, size = [], 0
+    total += size
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return total, first, time.perf_counter() - start, peak
+
+
+for name, result in (("whole", whole()), ("streamed", asyncio.get_event_loop().run_until_complete(streamed()))):
+    size, first, elapsed, peak = result
+    print(
+        "{:9} {:7.1f} MB  first byte {:7.1f} ms  total {:7.1f} ms  peak extra memory {:7.1f} MB".format(
+            name, size / 1e6, first * 1000, elapsed * 1000, peak / 1e6
+        )
+    )
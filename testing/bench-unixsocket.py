@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Latency of a rpc call over TCP localhost versus the rpcunixsocket, with a new connection per call
+and with a persistent one. Runs a local server on a dummy interface with the bismuthd app, no node needed.
+
+python3 bench-unixsocket.py [calls]
+"""
+
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from base64 import b64encode
+
+sys.path.append("../RPCServer")
+
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+
+from bismuthd import make_app, server_settings, unix_socket
+from rpcnotify import Hub
+from rpcregistry import Registry, rpc
+
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+PORT = 18116
+SOCKET = os.path.join(tempfile.gettempdir(), "bench-bismuthd.sock")
+
+
+class Config:
+    verbose = 0
+    rpcuser = "username"
+    rpcpassword = "password"
+    rpcauth = []
+    rpccompress = 1
+    rpccompressmin = 1024
+    rpccompresslevel = 6
+    rpcnokeepalive = 0
+    rpcidletimeout = 300
+    rpcclienttimeout = 30
+    rpcmaxbody = 10 * 1024 * 1024
+    rpcmaxbuffer = 10 * 1024 * 1024
+    rpcallowip = []
+    rpciprate = 0
+    rpcipburst = 0
+    rpcuserrate = 0
+    rpcuserburst = 0
+    rpcipv4prefix = 32
+    rpcipv6prefix = 64
+    rpcunixsocket = SOCKET
+    rpcunixsocketmode = "600"
+
+
+class Interface:
+    config = Config()
+    wallets = {"": None}
+
+    def __init__(self):
+        self.hub = Hub()
+
+    @rpc()
+    async def getblockcount(self, *args, **kwargs):
+        return 1000000
+
+
+def serve():
+    interface = Interface()
+    server = HTTPServer(make_app(interface, Registry(interface), interface.config), **server_settings(interface.config))
+    server.listen(PORT, address="127.0.0.1")
+    server.add_socket(unix_socket(interface.config))
+    IOLoop.current().start()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    http.client over a unix socket.
+    """
+
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+HEADERS = {
+    "Authorization": "Basic " + b64encode(b"username:password").decode(),
+    "Content-Type": "application/json",
+}
+
+
+def run(name, connect, keep_alive):
+    headers = dict(HEADERS)
+    if not keep_alive:
+        headers["Connection"] = "close"
+    body = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "getblockcount"})
+    connection = None
+    latencies = []
+    for i in range(CALLS):
+        start = time.perf_counter()
+        if connection is None:
+            connection = connect()
+        connection.request("POST", "/", body, headers)
+        response = connection.getresponse()
+        assert json.loads(response.read())["result"] == 1000000
+        if not keep_alive:
+            connection.close()
+            connection = None
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    print(
+        "{:5} keep-alive={:d}  mean {:6.0f} us  p50 {:6.0f} us  p99 {:6.0f} us".format(
+            name, keep_alive, statistics.mean(latencies), latencies[len(latencies) // 2],
+            latencies[int(len(latencies) * 0.99)]
+        )
+    )
+
+
+if __name__ == "__main__":
+    server = multiprocessing.Process(target=serve, daemon=True)
+    server.start()
+    time.sleep(1)
+    try:
+        for keep_alive in (False, True):
+            run("tcp", lambda: http.client.HTTPConnection("127.0.0.1", PORT), keep_alive)
+            run("unix", lambda: UnixHTTPConnection(SOCKET), keep_alive)
+    finally:
+        server.terminate()
+        os.remove(SOCKET)
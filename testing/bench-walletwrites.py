@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the wallet write path: concurrent address creation, fsyncs per address.
+Runs locally against a scratch wallet dir, no server needed.
+
+python3 bench-walletwrites.py [threads] [addresses_per_thread]
+"""
+
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append("../RPCServer")
+
+from rpcwallet import Wallet
+
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+path = tempfile.mkdtemp(prefix="bench-wallet")
+try:
+    # ECDSA so that keygen does not hide the write costs.
+    wallet = Wallet(path + "/.wallet", key_type="ECDSA")
+    before = wallet.journal.stats
+
+
+    def create(account):
+        for i in range(COUNT):
+            wallet.get_new_address(account)
+
+
+    threads = [
+        threading.Thread(target=create, args=("bench{}".format(i),))
+        for i in range(THREADS)
+    ]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    stats = wallet.journal.stats
+    wallet.close()
+
+    addresses = THREADS * COUNT
+    fsyncs = stats["fsyncs"] - before["fsyncs"]
+    print("{} addresses by {} threads in {:0.2f} sec".format(addresses, THREADS, elapsed))
+    print(
+        "{} writes, {} fsyncs, {:0.2f} fsync per address".format(
+            stats["records"] - before["records"], fsyncs, fsyncs / addresses
+        )
+    )
+finally:
+    shutil.rmtree(path)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Websocket json-rpc client: one call, then prints the new blocks and the default wallet activity as they come.
+
+python3 demo10-websocket.py
+"""
+
+import asyncio
+import json
+from base64 import b64encode
+
+from tornado.httpclient import HTTPRequest
+from tornado.websocket import websocket_connect
+
+URL = "ws://127.0.0.1:8115/ws"
+HEADERS = {"Authorization": "Basic " + b64encode(b"username:password").decode()}
+
+
+async def main():
+    connection = await websocket_connect(HTTPRequest(URL, headers=HEADERS))
+
+    async def request(method, *params):
+        await connection.write_message(json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params}))
+        return json.loads(await connection.read_message())
+
+    print(await request("getblockcount"))
+    print(await request("subscribe", "blocks"))
+    print(await request("subscribe", "wallet"))
+
+    while True:
+        message = await connection.read_message()
+        if message is None:
+            print("Closed")
+            break
+        print(json.loads(message))
+
+
+asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Stress test of the wallet locking: concurrent address creation, reads and signatures
+on several accounts, then checks that no address was lost and the reverse index is consistent.
+Runs locally against a scratch wallet dir, no server needed.
+
+python3 stress-wallet.py [threads] [rounds]
+"""
+
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append("../RPCServer")
+
+from polysign.signerfactory import SignerFactory
+
+from rpcwallet import Wallet
+
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+ROUNDS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+path = tempfile.mkdtemp(prefix="stress-wallet")
+errors = []
+created = {}
+
+
+def worker(wallet, account, shared):
+    """Each worker owns an account, and also hammers a shared one."""
+    try:
+        mine = []
+        for i in range(ROUNDS):
+            target = shared if i % 4 == 0 else account
+            address = wallet.get_new_address(target)
+            mine.append((target, address))
+            addresses = wallet.get_addresses_by_account(target)
+            if address not in addresses:
+                errors.append("{} missing from {} right after creation".format(address, target))
+            transaction = wallet.make_unsigned_transaction(address, address, 1, "stress")
+            signed = wallet.sign_transaction(transaction)
+            SignerFactory.verify_bis_signature(
+                signed[4],
+                signed[5],
+                str(tuple(transaction[:4] + transaction[6:8])).encode("utf-8"),
+                address,
+            )
+        created[account] = mine
+    except Exception as e:
+        errors.append("{}: {}".format(account, e))
+
+
+try:
+    # ECDSA so that keygen does not hide the locking.
+    wallet = Wallet(path + "/.wallet", key_type="ECDSA")
+    threads = [
+        threading.Thread(target=worker, args=(wallet, "stress{}".format(i), "shared"))
+        for i in range(THREADS)
+    ]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    print(
+        "{} threads x {} rounds in {:0.2f} sec".format(THREADS, ROUNDS, elapsed)
+    )
+
+    for mine in created.values():
+        for account, address in mine:
+            if address not in wallet.get_addresses_by_account(account):
+                errors.append("{} lost from {}".format(address, account))
+            if wallet.get_account(address) != account:
+                errors.append("{} not indexed to {}".format(address, account))
+    # On disk reverse index has to match a full rebuild
+    before = dict(wallet.address_to_account)
+    wallet.close()
+    reloaded = Wallet(path + "/.wallet", key_type="ECDSA")
+    if reloaded.address_to_account != before:
+        errors.append("rindex.json differs from memory")
+    reloaded.reindex()
+    if reloaded.address_to_account != before:
+        errors.append("rindex differs from a full reindex")
+    reloaded.close()
+finally:
+    shutil.rmtree(path)
+
+if errors:
+    for error in errors[:20]:
+        print(error)
+    print("FAILED: {} errors".format(len(errors)))
+    sys.exit(1)
+print("OK")
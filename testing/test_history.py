@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Wallet local history: indexed per address queries and synced heights.
+
+python3 -m pytest test_history.py
+"""
+
+import os
+import random
+import sqlite3
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../RPCServer"))
+
+import rpchistory
+from rpchistory import History
+
+
+def ledger_rows(count, addresses):
+    rows = []
+    for i in range(count):
+        height = 1000 + i // 3
+        rows.append(
+            [height, 1500000000.0 + i, random.choice(addresses), random.choice(addresses), "1.5",
+             "sig{:08d}".format(i), "pubkey", "hash{}".format(height), "0.01", "0", "", ""]
+        )
+    return rows
+
+
+def naive(history, addresses, count, skip):
+    rows = history.db.execute(
+        "SELECT {} FROM transactions ORDER BY block_height DESC, timestamp DESC".format(rpchistory.COLUMNS)
+    ).fetchall()
+    rows = [row for row in rows if row[2] in addresses or row[3] in addresses]
+    return rows[skip:skip + count]
+
+
+def test_transactions_match_full_scan(tmp_path, monkeypatch):
+    # Several IN chunks
+    monkeypatch.setattr(rpchistory, "IN_CHUNK", 3)
+    random.seed(1)
+    everyone = ["address{}".format(i) for i in range(20)]
+    history = History(str(tmp_path / "history.db"))
+    history.add(ledger_rows(500, everyone), 1200)
+    for tracked in ({"address1"}, set(everyone[:7]), set(everyone), {"unknown"}):
+        for count, skip in ((10, 0), (5, 7), (50, 100), (10, 10000)):
+            assert history.transactions(tracked, count, skip) == naive(history, tracked, count, skip)
+    assert history.transactions(None, 5, 2) == naive(history, set(everyone), 5, 2)
+
+
+def test_rescan_moves_synced_height_only(tmp_path):
+    fname = str(tmp_path / "history.db")
+    history = History(fname)
+    history.add([], 100)
+    history.synced(150)
+    history.synced(120)
+    assert (history.height, history.polled) == (150, 100)
+    history.close()
+    history = History(fname)
+    assert (history.height, history.polled) == (150, 100)
+
+
+def test_older_file_resumes_from_height(tmp_path):
+    fname = str(tmp_path / "history.db")
+    db = sqlite3.connect(fname)
+    db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    db.execute("INSERT INTO meta VALUES ('height', '42')")
+    db.commit()
+    db.close()
+    history = History(fname)
+    assert (history.height, history.polled) == (42, 42)
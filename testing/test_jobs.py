@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+A job blocks the jobs of the same name from its creation - pending - to its end.
+
+python3 -m pytest test_jobs.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../RPCServer"))
+
+from rpcjobs import JobRunning, Jobs
+
+
+def test_pending_job_blocks_same_name():
+    jobs = Jobs()
+    jobs.new("rescan")
+    with pytest.raises(JobRunning):
+        jobs.new("rescan")
+    jobs.new("importmulti")
+
+
+def test_finished_job_frees_name():
+    jobs = Jobs()
+    job = jobs.new("rescan")
+    job.start()
+    with pytest.raises(JobRunning):
+        jobs.new("rescan")
+    job.finish()
+    jobs.new("rescan")
+
+
+def test_cancel_only_ends_pending_jobs():
+    jobs = Jobs()
+    job = jobs.new("rescan")
+    job.cancel(ValueError("Invalid address"))
+    assert job.as_dict["status"] == "error"
+    assert job.as_dict["error"] == "Invalid address"
+    job = jobs.new("rescan")
+    job.start()
+    job.cancel(ValueError("late"))
+    assert job.running
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Hex privkeys (ECDSA, ED25519) are 64 hex chars, anything else is refused - not taken as a seed.
+
+python3 -m pytest test_keys.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../RPCServer"))
+
+from rpckeys import InvalidPrivkey, Key
+from rpcwallet import Wallet
+
+BAD_PRIVKEYS = ("hello world", "abcd", "11" * 31, "11" * 40, "zz" * 32, " " + "11" * 32)
+
+
+@pytest.mark.parametrize("key_type", ["ECDSA", "ED25519"])
+@pytest.mark.parametrize("privkey", BAD_PRIVKEYS)
+def test_bad_hex_privkey(key_type, privkey, capsys):
+    with pytest.raises(InvalidPrivkey):
+        Key().from_privkey(privkey, key_type)
+    assert capsys.readouterr().out == ""
+
+
+def test_importprivkey_refuses_bad_hex(tmp_path):
+    wallet = Wallet(str(tmp_path / "wallet"), key_type="ECDSA")
+    before = wallet.get_addresses_by_account("account")
+    with pytest.raises(InvalidPrivkey):
+        wallet.import_privkey("hello world", "account", key_type="ECDSA")
+    assert wallet.get_addresses_by_account("account") == before
+
+
+@pytest.mark.parametrize("key_type", ["ECDSA", "ED25519"])
+def test_hex_privkey_round_trip(key_type):
+    key = Key(key_type=key_type)
+    key.generate()
+    for privkey in (key.privkey, key.privkey.upper()):
+        assert Key().from_privkey(privkey, key_type).address == key.address
+
+
+def test_importmulti_reports_bad_hex_per_key(tmp_path):
+    wallet = Wallet(str(tmp_path / "wallet"), key_type="ECDSA")
+    good = Key(key_type="ED25519")
+    good.generate()
+    requests = [{"privkey": privkey, "account": "bulk", "key_type": "ECDSA"} for privkey in BAD_PRIVKEYS]
+    requests.append({"privkey": good.privkey, "account": "bulk", "key_type": "ED25519"})
+    results = wallet.import_privkeys(requests)
+    assert [result["success"] for result in results] == [False] * len(BAD_PRIVKEYS) + [True]
+    assert all("64 hex chars" in result["error"]["message"] for result in results[:-1])
+    assert [key_list[0] for key_list in wallet._get_account("bulk")["addresses"]][-1] == good.address
+    assert len(wallet._get_account("bulk")["addresses"]) == 2
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Direct ledger reads: gettransaction of a block without reward row, confirmations counted as for the balances.
+
+python3 -m pytest test_ledger.py
+"""
+
+import os
+import sqlite3
+import sys
+from base64 import b64encode
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../RPCServer"))
+
+from rpcledger import Ledger
+
+PUBKEY = b64encode(b"pubkey").decode("utf-8")
+
+
+def make_ledger(path):
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE transactions (block_height INTEGER, timestamp NUMERIC, address, recipient, amount, "
+        "signature, public_key, block_hash, fee, reward, operation, openfield)"
+    )
+    db.execute("CREATE TABLE misc (block_height INTEGER, difficulty)")
+    rows = [
+        # Block 1: a transfer and the reward
+        (1, 10.0, "alice", "bob", "1", "sig_transfer", PUBKEY, "hash1", "0.01", "0", "", ""),
+        (1, 10.5, "miner", "miner", "0", "sig_reward1", PUBKEY, "hash1", "0", "10", "", ""),
+        # Block 2: no reward row
+        (2, 20.0, "bob", "alice", "0.5", "sig_mirror", PUBKEY, "hash2", "0", "0", "", ""),
+        (3, 30.0, "miner", "miner", "0", "sig_reward3", PUBKEY, "hash3", "0", "10", "", ""),
+    ]
+    db.executemany("INSERT INTO transactions VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+    db.commit()
+    db.close()
+
+
+def test_get_transaction(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    make_ledger(path)
+    ledger = Ledger(path, None)
+    try:
+        transaction = ledger.command("api_gettransaction", ["sig_transfer", True])
+        assert transaction["blockminer"] == "miner"
+        assert transaction["blocktime"] == 10.5
+        # Tip is 3: blocks 1, 2 and 3
+        assert transaction["confirmations"] == 3
+        transaction = ledger.command("api_gettransaction", ["sig_mirror", True])
+        assert transaction["blocktime"] == 20.0
+        assert transaction["confirmations"] == 2
+        assert ledger.command("api_gettransaction", ["sig_reward3", True])["confirmations"] == 1
+        assert ledger.fallbacks == 0
+    finally:
+        ledger.close()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Rate limits: a batch costs one token per call, a batch larger than the burst is refused.
+
+python3 -m pytest test_ratelimit.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../RPCServer"))
+
+from rpclimit import SQL_BUCKETS, BatchTooLarge, Limits, RateLimited, RateLimiter
+from rpcsharedcache import SharedCache, connect
+
+
+def limiters(tmp_path):
+    path = str(tmp_path / "shared.db")
+    SharedCache.create(path, SQL_BUCKETS)
+    return [
+        RateLimiter(rate=10, burst=20, name="ip"),
+        RateLimiter(rate=10, burst=20, db=connect(path), name="ip"),
+    ]
+
+
+def test_batch_costs_one_token_per_call(tmp_path):
+    for limiter in limiters(tmp_path):
+        assert limiter.take("client", 20, now=100) == 0
+        assert limiter.take("client", 1, now=100) > 0
+        # 10 tokens per sec
+        assert limiter.take("client", 10, now=101) == 0
+        assert limiter.take("client", 5, now=101) == pytest.approx(0.5)
+
+
+def test_batch_larger_than_burst(tmp_path):
+    for limiter in limiters(tmp_path):
+        with pytest.raises(BatchTooLarge) as info:
+            limiter.take("client", 21, now=100)
+        assert info.value.code == RateLimited.code
+        assert info.value.data == {"limit": "ip", "batch": 21, "burst": 20}
+        assert "retry_after" not in info.value.data
+        # Nothing was spent
+        assert limiter.take("client", 20, now=100) == 0
+
+
+def test_check_batch():
+    limits = Limits(ip_rate=10, ip_burst=20, user_rate=5, user_burst=8)
+    limits.check_batch(8)
+    with pytest.raises(BatchTooLarge) as info:
+        limits.check_batch(9)
+    assert info.value.data["limit"] == "user"
+    # No limit, no max batch size
+    Limits().check_batch(1000)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dumped keys carry their type, so hex privkeys can be imported again.
+
+python3 -m pytest test_wallet_dump.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../RPCServer"))
+
+from rpcwallet import Wallet
+
+
+def test_dumpprivkey_with_type(tmp_path):
+    wallet = Wallet(str(tmp_path / "wallet"), key_type="ECDSA")
+    address = wallet.get_new_address("account", "ED25519")
+    dumped = wallet.dump_privkey(address, with_type=True)
+    assert dumped["key_type"] == "ED25519"
+    assert dumped["privkey"] == wallet.dump_privkey(address)
+
+    other = Wallet(str(tmp_path / "other"), key_type="ECDSA")
+    assert other.import_privkey(dumped["privkey"], "account", key_type=dumped["key_type"]) == address
+
+
+def test_dumpwallet_lines_have_type(tmp_path):
+    wallet = Wallet(str(tmp_path / "wallet"), key_type="ECDSA")
+    address = wallet.get_new_address("account")
+    dump = str(tmp_path / "dump.txt")
+    wallet.dump_wallet(dump)
+    lines = [line.split() for line in open(dump) if not line.startswith("#")]
+    assert lines
+    assert all(line[-1].startswith("type=") for line in lines)
+    assert ["account=account", "addr={}".format(address), "type=ECDSA"] in [line[2:] for line in lines]
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Regression: new addresses created while the wallet is being encrypted are either refused (LockedWallet)
+or end up encrypted in the wallet - never lost. An encryption interrupted at its very end can be resumed.
+
+python3 -m pytest test_wallet_recrypt.py
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../RPCServer"))
+
+from rpckeys import is_encrypted_privkey
+from rpcwallet import RECRYPT_FILE, LockedWallet, RecryptInProgress, Wallet
+
+# Each key costs about a second to encrypt, keep the wallet small
+ACCOUNTS = 2
+KEYS_PER_ACCOUNT = 2
+THREADS = 4
+# New addresses per writer, at most
+WRITES = 3
+
+
+def test_new_addresses_during_encryption(tmp_path):
+    wallet = Wallet(str(tmp_path / "wallet"), key_type="ECDSA")
+    for i in range(ACCOUNTS):
+        for _ in range(KEYS_PER_ACCOUNT):
+            wallet.get_new_address("account{}".format(i))
+
+    created = []
+    errors = []
+    start = threading.Barrier(THREADS + 1)
+
+    def writer(account):
+        start.wait()
+        writes = 0
+        while writes < WRITES:
+            try:
+                address = wallet.get_new_address(account)
+            except LockedWallet:
+                # Encryption started, no more writes until it's done
+                return
+            except Exception as e:
+                errors.append(e)
+                return
+            # Wallet encrypted and locked: "Wallet has to be unlocked first"
+            if address.startswith("Wallet"):
+                return
+            created.append(address)
+            writes += 1
+
+    threads = [
+        threading.Thread(target=writer, args=("account{}".format(i % ACCOUNTS),)) for i in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    try:
+        wallet.encrypt("passphrase")
+    finally:
+        for thread in threads:
+            thread.join()
+
+    assert not errors
+    assert wallet.encrypted
+    stored = {}
+    for _, account_details in wallet._parse_accounts():
+        assert account_details["encrypted"]
+        assert "crypt_id" not in account_details
+        for address in account_details["addresses"]:
+            stored[address[0]] = address[2]
+    assert set(created) <= set(stored)
+    assert all(is_encrypted_privkey(privkey) for privkey in stored.values())
+
+
+def test_account_changed_after_snapshot(tmp_path):
+    wallet = Wallet(str(tmp_path / "wallet"), key_type="ECDSA")
+    wallet.get_new_address("account")
+    batch = [(name, details) for name, details in wallet._parse_accounts() if name == "account"]
+    address = wallet.get_new_address("account")
+    wallet._recrypt_accounts(batch, "", "passphrase", "run")
+
+    account = wallet._get_account("account")
+    assert account["crypt_id"] == "run"
+    assert address in [key_list[0] for key_list in account["addresses"]]
+    assert all(is_encrypted_privkey(key_list[2]) for key_list in account["addresses"])
+
+
+def test_resume_after_index_saved(tmp_path, monkeypatch):
+    path = str(tmp_path / "wallet")
+    wallet = Wallet(path, key_type="ECDSA")
+    wallet.get_new_address("account")
+
+    def crash(self):
+        raise OSError("crash")
+
+    # Crash between the index save and the end of the run
+    monkeypatch.setattr(Wallet, "_end_recrypt", crash)
+    with pytest.raises(OSError):
+        wallet.encrypt("passphrase")
+    monkeypatch.undo()
+    wallet.close()
+
+    wallet = Wallet(path, key_type="ECDSA")
+    assert wallet.encrypted and wallet.locked
+    with pytest.raises(RecryptInProgress):
+        wallet.encrypt("other")
+    wallet.encrypt("passphrase")
+    assert not wallet.locked
+    assert not os.path.exists(os.path.join(path, RECRYPT_FILE))
+    for _, account_details in wallet._parse_accounts():
+        assert "crypt_id" not in account_details
+    # Writers are let in again
+    wallet.set_passphrase("passphrase", 10)
+    assert not wallet.get_new_address("account").startswith("Wallet")
+    wallet.close()